@@ -1,10 +1,15 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from core.auth import AuthService
-from config.settings import USERS_FILE
+from core.registry import get_auth_service
+from core.password_hasher import AuthBusy
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
-auth_service = AuthService(USERS_FILE)
+
+def _busy(e):
+    """429 while the password hashing queue is full"""
+    response = jsonify({"error": str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
 
 @auth_bp.route("/register", methods=["POST"])
 def register():
@@ -19,7 +24,7 @@ def register():
             return jsonify({"error": "Username, password, and email are required"}), 400
             
         # Register user
-        result = auth_service.register_user(
+        result = get_auth_service().register_user(
             username=username,
             password=password,
             email=email
@@ -36,6 +41,8 @@ def register():
         else:
             return jsonify({"error": result["message"]}), 400
             
+    except AuthBusy as e:
+        return _busy(e)
     except Exception as e:
         print(f"Error in register: {e}")
         return jsonify({"error": str(e)}), 500
@@ -50,7 +57,7 @@ def login():
         if not username or not password:
             return jsonify({"error": "Username and password are required"}), 400
         
-        user = auth_service.validate_user(username, password)
+        user = get_auth_service().validate_user(username, password)
         
         if user:
             # Generate JWT token
@@ -63,6 +70,8 @@ def login():
         else:
             return jsonify({"error": "Invalid username or password"}), 401
             
+    except AuthBusy as e:
+        return _busy(e)
     except Exception as e:
         print(f"Error in login: {e}")
         return jsonify({"error": str(e)}), 500
@@ -75,13 +84,10 @@ def get_current_user():
         username = get_jwt_identity()
         print(f"Getting user profile for: {username}")
         
-        users_data = auth_service.load_users()
-        
-        for user in users_data["users"]:
-            if user["username"] == username:
-                # Return user info without password
-                user_info = {k: v for k, v in user.items() if k != "password"}
-                return jsonify(user_info)
+        # In-memory lookup; users.json is only re-read after it changes
+        user_info = get_auth_service().get_user(username)
+        if user_info is not None:
+            return jsonify(user_info)
         
         return jsonify({"error": "User not found"}), 404
         
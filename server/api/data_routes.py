@@ -1,78 +1,86 @@
-from flask import Blueprint, request, jsonify
+from email.utils import parsedate_to_datetime
+
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from core.data_service import DoorDashDataService
-from config.settings import DATA_FILE
-from datetime import datetime, timedelta
-from collections import Counter
+from core.aggregates import GRANULARITIES, day_range, range_response
+from core.registry import get_data_service, get_response_cache
+from core.response_cache import cached_json
+from utils.compression import encoded_etags
+from utils.session_export import iter_sessions, iter_ndjson, iter_csv
 
 data_bp = Blueprint('data', __name__, url_prefix='/api')
-data_service = DoorDashDataService(DATA_FILE)
+
+def _not_modified(etag, last_modified):
+    """The tag to answer 304 with if the client's validators still match, else None"""
+    if request.if_none_match:
+        # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2);
+        # compressed responses carry a per-coding variant of the tag
+        for tag in encoded_etags(etag):
+            if request.if_none_match.contains(tag):
+                return tag
+        return None
+    since = request.headers.get('If-Modified-Since')
+    if since and last_modified:
+        try:
+            if int(last_modified) <= parsedate_to_datetime(since).timestamp():
+                return etag
+        except (TypeError, ValueError):
+            pass
+    return None
+
+def _conditional_response(build, aggregate=False):
+    """Answer 304 if the data is unchanged, otherwise run ``build`` and tag the result.
+
+    ``build`` only runs when the client needs a body, so revalidations skip
+    the aggregation work entirely, and repeat requests for the same data
+    are served from the response cache.
+    """
+    service = get_data_service()
+    etag, last_modified = service.validators()
+    matched = _not_modified(etag, last_modified) if etag else None
+    if matched:
+        response = current_app.response_class(status=304)
+        etag = matched
+    else:
+        response = cached_json(get_response_cache(), service.version, lambda: build(service))
+        if aggregate:
+            response.headers['X-Aggregates-Age'] = str(int(service.aggregates_age()))
+    if etag:
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+    # Cached copies must be revalidated, and only by this user's client
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _limit_param():
+    """``limit`` (or its alias ``top``) from the query string; None means no limit"""
+    value = request.args.get('limit', request.args.get('top'))
+    if value in (None, ''):
+        return None
+    limit = int(value)
+    if limit < 0:
+        raise ValueError("limit must not be negative")
+    return limit
+
+def _date_params():
+    """Validated ``start_date``/``end_date`` from the query string (None when absent)"""
+    start_date = request.args.get('start_date') or None
+    end_date = request.args.get('end_date') or None
+    day_range(start_date, end_date)
+    return start_date, end_date
 
 @data_bp.route("/summary")
 @jwt_required()
 def api_summary():
+    # Optional YYYY-MM-DD bounds, answered from daily prefix sums
     try:
-        # Try to refresh cache first, but fall back to load_data if refresh_cache is not available
-        try:
-            data = data_service.refresh_cache()
-        except AttributeError:
-            data = data_service.load_data()
-            
-        sessions = data.get("sessions", [])
-        
-        # Calculate totals with error handling
-        total_earnings = 0
-        total_deliveries = 0
-        total_dash_minutes = 0
-        total_active_minutes = 0
-        challenge_bonus_amount = 0
-        challenge_bonus_count = 0
-        
-        for session in sessions:
-            # Include challenge bonuses in total earnings
-            if "challenge_bonus" in session:
-                bonus_amount = float(session.get("challenge_bonus", 0))
-                total_earnings += bonus_amount
-                challenge_bonus_count += 1
-                challenge_bonus_amount += bonus_amount
-            
-            # Sum delivery totals
-            if "deliveries" in session:
-                delivery_count = len(session.get("deliveries", []))
-                total_deliveries += delivery_count
-                
-                for delivery in session.get("deliveries", []):
-                    if "total" in delivery:
-                        amount = float(delivery.get("total", 0))
-                        total_earnings += amount
-            
-            # Sum time values
-            if "dash_time_minutes" in session:
-                dash_time = float(session.get("dash_time_minutes", 0))
-                total_dash_minutes += dash_time
-                    
-            if "active_time_minutes" in session:
-                active_time = float(session.get("active_time_minutes", 0))
-                total_active_minutes += active_time
-        
-        # Calculate averages (avoid division by zero)
-        avg_per_delivery = total_earnings / max(1, total_deliveries)
-        avg_per_hour = total_earnings / (total_dash_minutes / 60) if total_dash_minutes > 0 else 0
-        time_efficiency = (total_active_minutes / total_dash_minutes * 100) if total_dash_minutes > 0 else 0
-        
-        summary = {
-            "total_earnings": round(total_earnings, 2),
-            "total_deliveries": total_deliveries,
-            "total_offers": total_deliveries,  # Add alias for compatibility
-            "total_dash_min": total_dash_minutes,
-            "total_active_min": total_active_minutes,
-            "avg_per_delivery": round(avg_per_delivery, 2),
-            "avg_per_hour": round(avg_per_hour, 2),
-            "time_efficiency": round(time_efficiency, 2),
-            "challenge_bonus_total": round(challenge_bonus_amount, 2),
-        }
-        
-        return jsonify(summary)
+        start_date, end_date = _date_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        # Served from the backend's aggregates, no per-request scan
+        return _conditional_response(lambda service: service.summary(start_date, end_date), aggregate=True)
         
     except Exception as e:
         print(f"Error in summary endpoint: {e}")
@@ -89,222 +97,74 @@ def api_summary():
             "error": str(e)
         })
 
+@data_bp.route("/range")
+@jwt_required()
+def get_range_totals():
+    """Raw totals for sessions between start_date and end_date (inclusive)"""
+    try:
+        start_date, end_date = _date_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return _conditional_response(
+        lambda service: range_response(start_date, end_date, service.range_totals(start_date, end_date)),
+        aggregate=True,
+    )
+
 @data_bp.route('/restaurants')
 @jwt_required()
 def get_restaurant_data():
-    # Group deliveries by restaurant
-    restaurant_data = {}
-    data = data_service.load_data()
-    
-    for session in data['sessions']:
-        # Skip sessions without deliveries array
-        if 'deliveries' not in session:
-            continue
-            
-        for delivery in session['deliveries']:
-            rest_name = delivery['restaurant']
-            if rest_name not in restaurant_data:
-                restaurant_data[rest_name] = {
-                    'name': rest_name,
-                    'deliveries_count': 0,
-                    'total_earnings': 0.0,  # Explicitly use float
-                    'base_pay_total': 0.0,  # Explicitly use float
-                    'tips_total': 0.0,      # Explicitly use float
-                    'dates': []
-                }
-            
-            # Update restaurant stats with proper type conversion
-            restaurant_data[rest_name]['deliveries_count'] += 1
-            restaurant_data[rest_name]['total_earnings'] += float(delivery.get('total', 0))
-            restaurant_data[rest_name]['base_pay_total'] += float(delivery.get('doordash_pay', 0))
-            restaurant_data[rest_name]['tips_total'] += float(delivery.get('tip', 0))
-            
-            # Add date if not already included
-            if session['date'] not in restaurant_data[rest_name]['dates']:
-                restaurant_data[rest_name]['dates'].append(session['date'])
-    
-    # Convert to list and sort by total earnings
-    restaurants_list = list(restaurant_data.values())
-    
-    # Add derived metrics
-    for restaurant in restaurants_list:
-        if restaurant['deliveries_count'] > 0:
-            restaurant['avg_per_delivery'] = round(restaurant['total_earnings'] / restaurant['deliveries_count'], 2)
-        else:
-            restaurant['avg_per_delivery'] = 0
-        restaurant['visit_count'] = len(restaurant['dates'])
-    
-    # Sort by total earnings (descending)
-    restaurants_list.sort(key=lambda x: x['total_earnings'], reverse=True)
-    
-    return jsonify(restaurants_list)
+    # Group deliveries by restaurant, sorted by total earnings
+    try:
+        limit = _limit_param()
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    return _conditional_response(lambda service: service.restaurants_summary(limit), aggregate=True)
 
 @data_bp.route('/weekly')
 @jwt_required()
 def get_weekly_data():
-    weekly_data = []
-    week_map = {}
-    data = data_service.load_data()
-    
-    # Sort sessions by date
-    sorted_sessions = sorted(data['sessions'], key=lambda s: s['date'])
-    
-    for session in sorted_sessions:
-        date_obj = datetime.strptime(session['date'], '%Y-%m-%d')
-        # Find the Monday of this week
-        start_of_week = date_obj - timedelta(days=date_obj.weekday())
-        week_key = start_of_week.strftime('%Y-%m-%d')
-        
-        # Calculate end of week (Sunday)
-        end_of_week = start_of_week + timedelta(days=6)
-        end_key = end_of_week.strftime('%Y-%m-%d')
-        
-        # Create or update week data
-        if week_key not in week_map:
-            week_num = int(start_of_week.strftime('%V'))  # ISO week number
-            week_map[week_key] = {
-                'id': len(week_map) + 1,
-                'week_number': week_num,
-                'start_date': week_key,
-                'end_date': end_key,
-                'earnings': 0,
-                'deliveries': 0,
-                'dash_minutes': 0,
-                'active_minutes': 0,
-                'gas': 0,
-                'challenge_bonus': 0
-            }
-        
-        # Add challenge bonus if present
-        if 'challenge_bonus' in session:
-            week_map[week_key]['challenge_bonus'] += session['challenge_bonus']
-            week_map[week_key]['earnings'] += session['challenge_bonus']
-            continue
-        
-        # Sum up the week's delivery data
-        if 'deliveries' in session:
-            session_earnings = sum(delivery['total'] for delivery in session['deliveries'])
-            week_map[week_key]['earnings'] += session_earnings
-            week_map[week_key]['deliveries'] += session['deliveries_count']
-        
-        # Only add time metrics if available
-        if 'dash_time_minutes' in session and 'active_time_minutes' in session:
-            week_map[week_key]['dash_minutes'] += session['dash_time_minutes']
-            week_map[week_key]['active_minutes'] += session['active_time_minutes']
-    
-    # Convert map to sorted list
-    weekly_data = list(week_map.values())
-    weekly_data.sort(key=lambda w: w['start_date'])
-    
-    return jsonify(weekly_data)
+    # Monday-based weekly totals in date order
+    return _conditional_response(lambda service: service.weekly())
 
 @data_bp.route('/locations')
 @jwt_required()
 def get_locations():
-    # Extract and count restaurant locations
-    data = data_service.load_data()
-    all_restaurants = []
-    
-    for session in data['sessions']:
-        if 'deliveries' not in session:
-            continue
-        
-        for delivery in session['deliveries']:
-            if 'restaurant' in delivery:
-                all_restaurants.append(delivery['restaurant'])
-    
-    # Count occurrences
-    location_counts = Counter(all_restaurants)
-    
-    # Convert to list of objects with counts
-    locations = [{'name': loc, 'count': count} for loc, count in location_counts.items()]
-    
-    # Sort by count descending
-    locations.sort(key=lambda x: x['count'], reverse=True)
-    
-    return jsonify(locations)
+    # Count deliveries per restaurant location, most visited first
+    try:
+        limit = _limit_param()
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    return _conditional_response(lambda service: service.locations(limit), aggregate=True)
+
+@data_bp.route('/rollup')
+@jwt_required()
+def get_rollup():
+    """Totals per day, week (Monday-based), month, quarter or year in date order"""
+    granularity = (request.args.get('granularity') or 'week').lower()
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of: {', '.join(GRANULARITIES)}"}), 400
+    return _conditional_response(lambda service: service.rollup(granularity), aggregate=True)
+
+@data_bp.route('/heatmap')
+@jwt_required()
+def get_heatmap():
+    """Weekday x hour grid (Monday first) of earnings per hour, deliveries and active-time ratio"""
+    return _conditional_response(lambda service: service.heatmap(), aggregate=True)
 
 @data_bp.route('/timeseries')
 @jwt_required()
 def get_timeseries_data():
     """Get earnings data over time for charting"""
     try:
-        data = data_service.load_data()
-        
-        # Ensure sessions is ALWAYS an array, even if data structure is wrong
-        sessions = data.get("sessions", []) if isinstance(data, dict) else []
-        
-        # Make sure we have a valid list and sort it properly
-        if not isinstance(sessions, list):
-            sessions = []
-        else:
-            # Sort by date - only sort if we have valid dates
-            try:
-                sessions = sorted(sessions, key=lambda x: x.get("date", ""))
-            except Exception as e:
-                print(f"Error sorting sessions: {e}")
-                # Continue with unsorted sessions if sorting fails
-        
-        # Initialize response structure with empty arrays
-        timeseries = {
-            "labels": [],
-            "earnings": [],
-            "deliveries": [],
-            "dash_time": [],
-            "active_time": []
-        }
-        
-        # Process each session with careful error handling
-        for session in sessions:
-            # Skip invalid sessions
-            if not isinstance(session, dict) or "date" not in session:
-                continue
-                
-            # Add date to labels
-            timeseries["labels"].append(session["date"])
-            
-            # Calculate earnings safely
-            session_earnings = 0
-            if "earnings" in session and isinstance(session["earnings"], (int, float)):
-                session_earnings = float(session["earnings"])
-            else:
-                try:
-                    # Sum delivery totals if they exist
-                    deliveries = session.get("deliveries", [])
-                    if isinstance(deliveries, list):
-                        for delivery in deliveries:
-                            if isinstance(delivery, dict) and "total" in delivery:
-                                session_earnings += float(delivery.get("total", 0))
-                except Exception as e:
-                    print(f"Error calculating earnings for session {session.get('date')}: {e}")
-            
-            timeseries["earnings"].append(round(session_earnings, 2))
-            
-            # Add delivery count (ensure it's a number)
-            try:
-                deliveries_count = int(session.get("deliveries_count", 0))
-            except (ValueError, TypeError):
-                deliveries_count = 0
-            timeseries["deliveries"].append(deliveries_count)
-            
-            # Add time metrics (ensure they're numbers)
-            try:
-                dash_time = float(session.get("dash_time_minutes", 0))
-            except (ValueError, TypeError):
-                dash_time = 0
-            timeseries["dash_time"].append(dash_time)
+        def build(service):
+            timeseries = service.timeseries()
             
-            try:
-                active_time = float(session.get("active_time_minutes", 0))
-            except (ValueError, TypeError):
-                active_time = 0
-            timeseries["active_time"].append(active_time)
+            # Ensure we have data to return
+            if not timeseries["labels"]:
+                print("Warning: No valid timeseries data found")
+            return timeseries
         
-        # Ensure we have data to return
-        if not timeseries["labels"]:
-            print("Warning: No valid timeseries data found")
-            
-        return jsonify(timeseries)
+        return _conditional_response(build)
     except Exception as e:
         print(f"Error in timeseries endpoint: {e}")
         import traceback
@@ -316,4 +176,38 @@ def get_timeseries_data():
             "dash_time": [],
             "active_time": [],
             "error": str(e)
-        })
\ No newline at end of file
+        })
+
+@data_bp.route('/export')
+@jwt_required()
+def export_sessions():
+    """Stream sessions as NDJSON or CSV, filtered like GET /api/sessions.
+
+    ``format=csv&level=delivery`` gives one row per delivery instead of per
+    session. Rows are written as they're read, a page at a time.
+    """
+    fmt = (request.args.get('format') or 'ndjson').lower()
+    level = (request.args.get('level') or 'session').lower()
+    if fmt not in ('ndjson', 'csv') or level not in ('session', 'delivery'):
+        return jsonify({"error": "Use format=ndjson|csv and level=session|delivery"}), 400
+    try:
+        start_date, end_date = _date_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    sessions = iter_sessions(
+        get_data_service(),
+        start_date=start_date,
+        end_date=end_date,
+        merchant=request.args.get('merchant'),
+        merchant_type=request.args.get('merchant_type')
+    )
+    if fmt == 'csv':
+        body, mimetype = iter_csv(sessions, level), 'text/csv'
+    else:
+        body, mimetype = iter_ndjson(sessions), 'application/x-ndjson'
+    
+    response = current_app.response_class(body, mimetype=mimetype)
+    filename = "deliveries" if fmt == 'csv' and level == 'delivery' else "sessions"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -1,15 +1,13 @@
 from flask import Blueprint, request, jsonify
-from core.data_service import DoorDashDataService
-from config.settings import DATA_FILE
+from core.registry import get_auth_service, get_data_service, get_response_cache
 
 debug_bp = Blueprint('debug', __name__, url_prefix='/api/debug')
-data_service = DoorDashDataService(DATA_FILE)
 
 @debug_bp.route("")
 def api_debug():
     """Debug endpoint to check data structure"""
     try:
-        data = data_service.load_data()
+        data = get_data_service().load_data()
         
         # Basic stats
         session_count = len(data.get("sessions", []))
@@ -31,7 +29,7 @@ def api_debug():
         debug_info = {
             "total_sessions": session_count,
             "sessions_with_deliveries": sessions_with_deliveries,
-            "data_file": str(DATA_FILE),
+            "data_file": str(get_data_service().data_file),
             "sample_session": first_session
         }
         
@@ -39,11 +37,21 @@ def api_debug():
     except Exception as e:
         return jsonify({"error": str(e)})
 
+@debug_bp.route("/cache")
+def api_debug_cache():
+    """Response cache size and hit/miss counters for this worker"""
+    return jsonify(get_response_cache().stats())
+
+@debug_bp.route("/auth")
+def api_debug_auth():
+    """Password hashing pool load and latency for this worker"""
+    return jsonify(get_auth_service().hasher.stats())
+
 @debug_bp.route("/summary")
 def api_debug_summary():
     """Debug endpoint to test summary calculations"""
     try:
-        data = data_service.load_data()
+        data = get_data_service().load_data()
         sessions = data.get("sessions", [])
         
         # Detailed calculation breakdown
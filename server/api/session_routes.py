@@ -1,17 +1,31 @@
+import base64
+import json
+
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from core.data_service import DoorDashDataService
-from config.settings import DATA_FILE
+from core.registry import get_data_service, get_response_cache
+from core.response_cache import cached_json_stream
 from utils.validation import validate_session
+from utils.session_import import READERS
+
+# Most row errors listed in a rejected bulk upload
+MAX_REPORTED_ERRORS = 100
 
 session_bp = Blueprint('session', __name__, url_prefix='/api/sessions')
-data_service = DoorDashDataService(DATA_FILE)
+
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    """(date, id) from an opaque cursor, or None for the first page"""
+    if not cursor:
+        return None
+    date, session_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    return str(date), int(session_id)
 
 @session_bp.route("")
 @jwt_required()
 def get_sessions():
-    data = data_service.load_data()
-    
     # Get query parameters for filtering
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -20,28 +34,53 @@ def get_sessions():
     limit = int(request.args.get('limit', 1000))
     offset = int(request.args.get('offset', 0))
     
-    sessions = data["sessions"]
+    # Passing `cursor` (empty for the first page) switches to keyset
+    # pagination in (date, id) order; otherwise pages are in file order
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            after = _decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid cursor"}), 400
     
-    # Apply filters if provided
-    if start_date:
-        sessions = [s for s in sessions if s["date"] >= start_date]
-    if end_date:
-        sessions = [s for s in sessions if s["date"] <= end_date]
-    if merchant:
-        sessions = [s for s in sessions if any(d["restaurant"] == merchant for d in s.get("deliveries", []))]
+    service = get_data_service()
     
-    # Get total count before pagination
-    total_count = len(sessions)
-    
-    # Paginate results
-    sessions = sessions[offset:offset+limit]
+    def build():
+        # Filtering and pagination happen in the storage backend
+        if cursor is not None:
+            sessions, total_count, next_key = service.query_sessions_after(
+                start_date=start_date,
+                end_date=end_date,
+                merchant=merchant,
+                merchant_type=merchant_type,
+                after=after,
+                limit=limit
+            )
+            return {
+                "sessions": sessions,
+                "total": total_count,
+                "limit": limit,
+                "next_cursor": _encode_cursor(next_key) if next_key else None
+            }
+        
+        sessions, total_count = service.query_sessions(
+            start_date=start_date,
+            end_date=end_date,
+            merchant=merchant,
+            merchant_type=merchant_type,
+            limit=limit,
+            offset=offset
+        )
+        return {
+            "sessions": sessions,
+            "total": total_count,
+            "limit": limit,
+            "offset": offset
+        }
     
-    return jsonify({
-        "sessions": sessions,
-        "total": total_count,
-        "limit": limit,
-        "offset": offset
-    })
+    # Identical queries against unchanged data are served from memory;
+    # otherwise each session of the page is built and serialized as it's sent
+    return cached_json_stream(get_response_cache(), service.version, build, "sessions")
 
 @session_bp.route("", methods=["POST"])
 @jwt_required()
@@ -54,32 +93,68 @@ def add_session():
             return jsonify({"error": "Invalid session data"}), 400
             
         # Add new session
-        success = data_service.add_session(new_session)
+        success = get_data_service().add_session(new_session)
         if not success:
             return jsonify({"error": "Failed to save session data"}), 500
         
-        # Refresh cache
-        data_service.refresh_cache()
-        
         return jsonify({"success": True, "message": "Session added successfully"})
     
     except Exception as e:
         print(f"Error adding session: {e}")
         return jsonify({"error": str(e)}), 500
 
+@session_bp.route("/bulk", methods=["POST"])
+@jwt_required()
+def add_sessions_bulk():
+    """Import a JSONL or CSV body of sessions, all committed in one write.
+
+    The format comes from ``?format=jsonl|csv`` or the Content-Type. If any
+    row fails validation nothing is imported and the row errors are returned,
+    so a corrected upload can simply be sent again.
+    """
+    try:
+        fmt = request.args.get('format') or ("csv" if request.mimetype == "text/csv" else "jsonl")
+        reader = READERS.get(fmt.lower())
+        if reader is None:
+            return jsonify({"error": "Unsupported format, use jsonl or csv"}), 400
+        
+        # Rows are parsed and validated as the body streams in
+        sessions, errors, error_count = [], [], 0
+        for row, session, error in reader(request.stream):
+            if error is None:
+                sessions.append(session)
+                continue
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": row, "error": error})
+        
+        if error_count:
+            return jsonify({"error": "Invalid session data", "error_count": error_count, "errors": errors}), 400
+        if not sessions:
+            return jsonify({"error": "No sessions in upload"}), 400
+        
+        if not get_data_service().add_sessions(sessions):
+            return jsonify({"error": "Failed to save session data"}), 500
+        
+        return jsonify({"success": True, "imported": len(sessions), "message": f"{len(sessions)} sessions added successfully"})
+    
+    except UnicodeDecodeError:
+        return jsonify({"error": "Upload is not valid UTF-8"}), 400
+    except Exception as e:
+        print(f"Error importing sessions: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @session_bp.route("/<session_id>", methods=["DELETE"])
 @jwt_required()
 def delete_session(session_id):
     try:
-        session_index = int(session_id)
-        success = data_service.delete_session(session_index)
+        # The session's persistent id, not its position in the list
+        success = get_data_service().delete_session(int(session_id))
         
         if success:
-            # Refresh cache
-            data_service.refresh_cache()
             return jsonify({"success": True, "message": "Session deleted successfully"})
         else:
-            return jsonify({"error": "Failed to delete session"}), 404
+            return jsonify({"error": "Session not found"}), 404
     except ValueError:
         return jsonify({"error": "Invalid session ID"}), 400
     except Exception as e:
@@ -1,18 +1,9 @@
 from __future__ import annotations
-import json
-from pathlib import Path
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
-import itertools
-from collections import Counter
-from functools import lru_cache
-import os
-import bcrypt
+from datetime import timedelta
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from datetime import timedelta
 
 # Import settings
 from config.settings import (
@@ -22,12 +13,18 @@ from config.settings import (
     DEBUG,
     PORT,
     HOST,
-    DATA_FILE
+    DATA_FILE,
+    USERS_FILE,
+    SQLITE_FILE,
+    STORAGE_BACKEND,
+    COMPRESS_MIN_SIZE,
+    COMPRESS_LEVEL
 )
 
 # Import services
-from core.data_service import DoorDashDataService
-from core.auth import AuthService
+from core import registry
+from utils.compression import init_compression
+from utils.json_provider import FastJSONProvider
 
 # Import blueprints
 from api.auth_routes import auth_bp
@@ -35,13 +32,12 @@ from api.data_routes import data_bp
 from api.session_routes import session_bp
 from api.debug_routes import debug_bp
 
-# Initialize services
-data_service = DoorDashDataService(DATA_FILE)
-auth_service = AuthService()
-
 def create_app():
     app = Flask(__name__, static_folder=str(CLIENT_BUILD), static_url_path='')
     
+    # Serialize API responses (and session records) with orjson when it's installed
+    app.json = FastJSONProvider(app)
+    
     # Configure CORS properly for development
     if DEBUG:
         # More permissive CORS for development
@@ -71,6 +67,18 @@ def create_app():
     # Initialize JWT
     jwt = JWTManager(app)
     
+    # Shared services (built lazily on first use, one copy per process)
+    app.config.setdefault("DATA_FILE", DATA_FILE)
+    app.config.setdefault("USERS_FILE", USERS_FILE)
+    app.config.setdefault("STORAGE_BACKEND", STORAGE_BACKEND)
+    app.config.setdefault("SQLITE_FILE", SQLITE_FILE)
+    registry.init_app(app)
+    
+    # Negotiated gzip/brotli for API responses
+    app.config.setdefault("COMPRESS_MIN_SIZE", COMPRESS_MIN_SIZE)
+    app.config.setdefault("COMPRESS_LEVEL", COMPRESS_LEVEL)
+    init_compression(app)
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(data_bp)
@@ -97,7 +105,8 @@ if __name__ == "__main__":
     app.run(debug=DEBUG, port=PORT, host=HOST)
 
 # Optional: Schedule background tasks if running in production
-if __name__ != "__main__" and not DEBUG:
+# (backends without an aggregate cache have nothing to precompute)
+if __name__ != "__main__" and not DEBUG and registry.services.has_aggregate_cache:
     import threading
     import time
     from tools.worker import precompute_aggregations
@@ -9,12 +9,48 @@ DATA_DIR = BASE_DIR / "data"
 DATA_FILE = DATA_DIR / "doordash_sessions.json"
 USERS_FILE = DATA_DIR / "users.json"
 CACHE_FILE = DATA_DIR / "cache.json"
+SQLITE_FILE = DATA_DIR / "doordash.sqlite3"
+
+# Merchant type rules (first matching rule wins) and how many distinct
+# restaurant names to remember the classification of
+MERCHANT_TYPES_FILE = Path(os.environ.get("MERCHANT_TYPES_FILE", BASE_DIR / "config" / "merchant_types.json"))
+MERCHANT_TYPE_CACHE_SIZE = int(os.environ.get("MERCHANT_TYPE_CACHE_SIZE", 65536))
+
+# Storage backend: "json" (sessions file + journal) or "sqlite"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json").lower()
+
+# Session journal: fold it into the sessions file past either threshold
+JOURNAL_MAX_RECORDS = int(os.environ.get("JOURNAL_MAX_RECORDS", 500))
+JOURNAL_MAX_BYTES = int(os.environ.get("JOURNAL_MAX_BYTES", 1024 * 1024))
+
+# Follow data file changes with inotify where available (stat polling otherwise)
+WATCH_DATA_FILES = os.environ.get("WATCH_DATA_FILES", "True").lower() == "true"
+
+# Keep a memory-mapped binary snapshot next to the JSON file, shared by all
+# workers, for fast cold starts and cross-process updates
+BINARY_SNAPSHOT = os.environ.get("BINARY_SNAPSHOT", "True").lower() == "true"
+
+# Most queued session writes the writer thread commits with one journal fsync
+WRITE_BATCH_MAX = int(os.environ.get("WRITE_BATCH_MAX", 1000))
+
+# In-memory cache of serialized GET responses, per worker process
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+# Compress /api/* responses of at least this many bytes (gzip, or brotli if installed)
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
 
 # Server settings
 DEBUG = os.environ.get("DEBUG", "True").lower() == "true"
 PORT = int(os.environ.get("PORT", 5000))
 HOST = os.environ.get("HOST", "0.0.0.0")
 
+# Password hashing: bcrypt cost for new hashes, hashes run at once per
+# process, and how many more may wait before logins get 429
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", 2))
+BCRYPT_QUEUE_DEPTH = int(os.environ.get("BCRYPT_QUEUE_DEPTH", 16))
+
 # JWT settings
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-this")
 JWT_ACCESS_TOKEN_EXPIRES = int(os.environ.get("JWT_TOKEN_EXPIRES", 12))  # hours
@@ -0,0 +1,48 @@
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+from core import codec
+from core.aggregates import RunningAggregates
+
+# Bump when the on-disk layout of the cache changes
+CACHE_FORMAT = 3
+
+
+class AggregateCache:
+    """Materialized RunningAggregates persisted next to the sessions file.
+
+    The cache records the data version it was computed from, and ``load``
+    ignores it unless that version matches the data being served. A write
+    therefore invalidates it implicitly until the worker saves a new copy.
+    """
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = Path(cache_file)
+
+    def load(self, version: str, to_number: Callable[[Any], float]) -> Optional[Tuple[RunningAggregates, float]]:
+        """Return ``(aggregates, computed_at)`` if the cache matches ``version``"""
+        try:
+            cached = codec.load_file(self.cache_file)
+            if cached.get("format") != CACHE_FORMAT or cached.get("version") != version:
+                return None
+            return RunningAggregates.from_dict(cached["aggregates"], to_number), cached["timestamp"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable aggregate cache: {e}")
+            return None
+
+    def save(self, aggregates: RunningAggregates, version: str, computed_at: float = None):
+        """Atomically write the aggregates for ``version``"""
+        payload = {
+            "format": CACHE_FORMAT,
+            "version": version,
+            "timestamp": computed_at if computed_at is not None else time.time(),
+            "aggregates": aggregates.to_dict(),
+        }
+        tmp_path = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(codec.dumps(payload))
+        os.replace(tmp_path, self.cache_file)
@@ -0,0 +1,663 @@
+import heapq
+from datetime import date
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+import numpy as np
+
+from core.columnar import SessionColumns, NO_DAY, NO_MINUTE, EPOCH_DAY, _day_number, _minute_of_day
+from core.models import RECORD_TYPES
+
+
+def _week_start(day: int) -> int:
+    """Day number of the Monday starting the week that contains ``day``"""
+    # date.toordinal() is 1 for Monday 0001-01-01, so weekday == (day - 1) % 7
+    return day - (day - 1) % 7
+
+
+# Rollup granularities; "day" is the daily table itself
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+
+def _period_start(day: int, granularity: str) -> int:
+    """Day number of the first day of the period containing ``day``"""
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return _week_start(day)
+    d = date.fromordinal(day)
+    if granularity == "month":
+        return date(d.year, d.month, 1).toordinal()
+    if granularity == "quarter":
+        return date(d.year, d.month - (d.month - 1) % 3, 1).toordinal()
+    return date(d.year, 1, 1).toordinal()
+
+
+# Months per period for the calendar granularities
+_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+
+def _period_starts(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Vectorized ``_period_start`` over an array of day numbers"""
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        return _week_start(days)
+    # Months since 1970-01; floor modulo keeps earlier dates right too
+    months = (days - EPOCH_DAY).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    months -= months % _MONTHS[granularity]
+    return months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + EPOCH_DAY
+
+
+def period_totals(dates: Dict[int, Dict[str, Any]], granularity: str) -> Dict[int, Dict[str, Any]]:
+    """Roll daily totals up into totals keyed by period start day number"""
+    if granularity == "day":
+        return {day: dict(row) for day, row in dates.items()}
+    if not dates:
+        return {}
+    days = np.fromiter(dates, dtype=np.int64, count=len(dates))
+    starts, index = np.unique(_period_starts(days, granularity), return_inverse=True)
+    rows = list(dates.values())
+    columns = {}
+    for name in _empty_period():
+        values = np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+        columns[name] = np.bincount(index, weights=values, minlength=len(starts))
+    columns["sessions"] = np.rint(columns["sessions"]).astype(np.int64)
+    return RunningAggregates._rows(starts, columns)
+
+
+def day_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+    """Inclusive day-number bounds for optional YYYY-MM-DD strings.
+
+    Raises ValueError for a date that doesn't parse.
+    """
+    bounds = []
+    for value, default in ((start_date, 0), (end_date, date.max.toordinal())):
+        if value is None:
+            bounds.append(default)
+            continue
+        day = _day_number(value)
+        if day == NO_DAY:
+            raise ValueError(f"Invalid date: {value}")
+        bounds.append(day)
+    return bounds[0], bounds[1]
+
+
+def _empty_period() -> Dict[str, Any]:
+    return {
+        "sessions": 0,
+        "earnings": 0.0,
+        "deliveries": 0.0,
+        "dash_minutes": 0.0,
+        "active_minutes": 0.0,
+        "challenge_bonus": 0.0,
+    }
+
+
+class DailyPrefixSums:
+    """Prefix sums over the daily totals for O(log n) date-range queries.
+
+    ``days`` is the sorted array of day numbers with data and every column
+    holds a leading zero, so the totals for ``days[i:j]`` are
+    ``column[j] - column[i]``.
+    """
+
+    FIELDS = ("sessions", "earnings", "deliveries", "dash_minutes", "active_minutes", "challenge_bonus")
+
+    def __init__(self, dates: Dict[int, Dict[str, Any]]):
+        self.days = np.array(sorted(dates), dtype=np.int64)
+        self.sums = {}
+        for name in self.FIELDS:
+            values = np.fromiter((dates[day][name] for day in self.days.tolist()), dtype=np.float64, count=len(self.days))
+            self.sums[name] = np.concatenate(([0.0], np.cumsum(values)))
+
+    def totals(self, start_day: int, end_day: int) -> Dict[str, Any]:
+        """Totals for days in ``[start_day, end_day]``, shaped like ``RunningAggregates.totals``"""
+        i = int(np.searchsorted(self.days, start_day, side="left"))
+        j = max(i, int(np.searchsorted(self.days, end_day, side="right")))
+        # Differences of large cumulative sums pick up float noise
+        sums = {name: round(float(column[j] - column[i]), 6) for name, column in self.sums.items()}
+        return {
+            "days": j - i,
+            "sessions": int(round(sums["sessions"])),
+            # Daily earnings include bonuses; totals keep them separate
+            "earnings": sums["earnings"] - sums["challenge_bonus"],
+            "deliveries": int(round(sums["deliveries"])),
+            "dash_minutes": sums["dash_minutes"],
+            "active_minutes": sums["active_minutes"],
+            "challenge_bonus": sums["challenge_bonus"],
+        }
+
+
+HOURS_PER_WEEK = 7 * 24
+MINUTES_PER_DAY = 24 * 60
+
+
+class HourlyHeatmap:
+    """Weekday x hour-of-day totals, each session spread over the hours it covers.
+
+    A session's values are split across the clock hours from its
+    ``start_time`` to its ``end_time`` in proportion to the minutes spent in
+    each; an end time before the start means the session ran past midnight
+    into the next weekday. Sessions without a usable date or times aren't
+    placed. ``grid[field]`` holds 168 cells, Monday 00:00 first.
+    """
+
+    FIELDS = ("earnings", "deliveries", "dash_minutes", "active_minutes")
+
+    def __init__(self):
+        self.grid = np.zeros((len(self.FIELDS), HOURS_PER_WEEK))
+        # Sessions placed on the grid
+        self.sessions = 0
+
+    @staticmethod
+    def _spans(day, start, end):
+        """Minute of the week each session starts at and its length in minutes"""
+        begin = (day - 1) % 7 * MINUTES_PER_DAY + start
+        return begin, (end - start) % MINUTES_PER_DAY
+
+    @classmethod
+    def build(cls, day: np.ndarray, start: np.ndarray, end: np.ndarray,
+              values: Dict[str, np.ndarray]) -> "HourlyHeatmap":
+        """Grid for sessions given as parallel arrays (day numbers, minutes of day, FIELDS)"""
+        heatmap = cls()
+        placed = (day != NO_DAY) & (start != NO_MINUTE) & (end != NO_MINUTE)
+        heatmap.sessions = int(np.count_nonzero(placed))
+        if not heatmap.sessions:
+            return heatmap
+        begin, length = cls._spans(day[placed].astype(np.int64), start[placed].astype(np.int64),
+                                   end[placed].astype(np.int64))
+
+        # One row per (session, hour touched); a zero-length session touches its start hour
+        first = begin // 60
+        hours = (begin + np.maximum(length, 1) - 1) // 60 - first + 1
+        owner = np.repeat(np.arange(len(begin)), hours)
+        hour = first[owner] + np.arange(len(owner)) - np.repeat(np.cumsum(hours) - hours, hours)
+        lo = np.maximum(hour * 60, begin[owner])
+        hi = np.minimum(hour * 60 + 60, begin[owner] + length[owner])
+        share = np.where(length[owner] > 0, (hi - lo) / np.maximum(length[owner], 1), 1.0)
+
+        cell = hour % HOURS_PER_WEEK
+        for i, name in enumerate(cls.FIELDS):
+            weights = values[name][placed][owner] * share
+            heatmap.grid[i] = np.bincount(cell, weights=weights, minlength=HOURS_PER_WEEK)
+        return heatmap
+
+    def apply(self, day: int, start: int, end: int, values: Dict[str, float], sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) one session"""
+        if day == NO_DAY or start == NO_MINUTE or end == NO_MINUTE:
+            return
+        begin, length = self._spans(day, start, end)
+        self.sessions += sign
+        if length == 0:
+            shares = [(begin // 60, 1.0)]
+        else:
+            shares = []
+            minute, stop = begin, begin + length
+            while minute < stop:
+                hour_end = min(stop, (minute // 60 + 1) * 60)
+                shares.append((minute // 60, (hour_end - minute) / length))
+                minute = hour_end
+        for i, name in enumerate(self.FIELDS):
+            value = sign * values[name]
+            for hour, share in shares:
+                self.grid[i, hour % HOURS_PER_WEEK] += value * share
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"sessions": self.sessions, "grid": self.grid.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HourlyHeatmap":
+        heatmap = cls()
+        heatmap.sessions = data["sessions"]
+        heatmap.grid = np.asarray(data["grid"], dtype=np.float64).reshape(len(cls.FIELDS), HOURS_PER_WEEK)
+        return heatmap
+
+    def response(self) -> Dict[str, Any]:
+        return heatmap_response(self.sessions, dict(zip(self.FIELDS, self.grid)))
+
+
+class RunningAggregates:
+    """Dashboard totals kept up to date as sessions are added and removed.
+
+    The aggregates are built once from the columnar store at load time and
+    then patched with ``apply(session, +1)`` / ``apply(session, -1)`` on
+    every write, so a write costs O(deliveries in the session) and reads
+    never rescan the archive.
+
+    ``dates`` holds totals per day and ``rollups`` the same totals per
+    week (Monday-based), month, quarter and year. All of them count every
+    delivery and bonus, like ``totals``. The rollups are derived from the
+    daily table at load (one pass over the days, not the sessions) and
+    patched alongside it on every write.
+
+    ``heatmap`` spreads the same per-session totals over weekday x hour
+    cells using each session's start and end time.
+    """
+
+    def __init__(self, to_number: Callable[[Any], float]):
+        self.to_number = to_number
+        self.totals: Dict[str, float] = {
+            "sessions": 0,
+            "earnings": 0.0,
+            "deliveries": 0,
+            "dash_minutes": 0.0,
+            "active_minutes": 0.0,
+            "challenge_bonus": 0.0,
+            "challenge_count": 0,
+        }
+        # restaurant name -> running sums plus a date -> delivery count map
+        self.restaurants: Dict[str, Dict[str, Any]] = {}
+        # day number -> daily totals
+        self.dates: Dict[int, Dict[str, Any]] = {}
+        # granularity -> period start day number -> totals
+        self.rollups: Dict[str, Dict[int, Dict[str, Any]]] = {g: {} for g in GRANULARITIES if g != "day"}
+        self.heatmap = HourlyHeatmap()
+        # Built from ``dates`` on the first range query after a change
+        self._prefix: Optional[DailyPrefixSums] = None
+
+    @classmethod
+    def from_columns(cls, cols: SessionColumns, to_number: Callable[[Any], float]) -> "RunningAggregates":
+        """Build all aggregates with vectorized reductions over the columns"""
+        agg = cls(to_number)
+        totals = agg.totals
+        totals["sessions"] = cols.n_sessions
+        totals["earnings"] = float(cols.total.sum())
+        totals["deliveries"] = cols.n_deliveries
+        totals["dash_minutes"] = float(cols.dash_minutes.sum())
+        totals["active_minutes"] = float(cols.active_minutes.sum())
+        totals["challenge_bonus"] = float(cols.bonus[cols.has_bonus].sum())
+        totals["challenge_count"] = int(np.count_nonzero(cols.has_bonus))
+
+        agg._build_restaurants(cols)
+        agg._build_dates(cols)
+        agg._build_rollups()
+        agg._build_heatmap(cols)
+        return agg
+
+    def _build_restaurants(self, cols: SessionColumns):
+        n = len(cols.restaurants)
+        if n == 0:
+            return
+        ids = cols.restaurant_id
+        counts = np.bincount(ids, minlength=n).tolist()
+        earnings = np.bincount(ids, weights=cols.total, minlength=n).tolist()
+        base_pay = np.bincount(ids, weights=cols.pay, minlength=n).tolist()
+        tips = np.bincount(ids, weights=cols.tip, minlength=n).tolist()
+
+        for rid, name in enumerate(cols.restaurants):
+            self.restaurants[name] = {
+                "deliveries_count": counts[rid],
+                "total_earnings": earnings[rid],
+                "base_pay_total": base_pay[rid],
+                "tips_total": tips[rid],
+                "dates": {},
+            }
+
+        # Deliveries per (restaurant, date) pair, kept in first-seen order
+        day = cols.day[cols.delivery_session].astype(np.int64)
+        pair = ids.astype(np.int64) * (1 << 32) + (day - NO_DAY)
+        _, first, pair_counts = np.unique(pair, return_index=True, return_counts=True)
+        order = np.argsort(first)
+        first = first[order]
+        labels = cols.labels
+        for rid, session, count in zip(ids[first].tolist(), cols.delivery_session[first].tolist(),
+                                       pair_counts[order].tolist()):
+            self.restaurants[cols.restaurants[rid]]["dates"][labels[session]] = count
+
+    def _build_dates(self, cols: SessionColumns):
+        dated = cols.day != NO_DAY
+        if not dated.any():
+            return
+        days, day_index = np.unique(cols.day[dated], return_inverse=True)
+        n = len(days)
+        session_totals = np.bincount(cols.delivery_session, weights=cols.total, minlength=cols.n_sessions)[dated]
+        session_counts = np.diff(cols.offsets)[dated]
+        bonus = np.where(cols.has_bonus[dated], cols.bonus[dated], 0.0)
+
+        columns = {
+            "sessions": np.bincount(day_index, minlength=n),
+            "earnings": np.bincount(day_index, weights=session_totals + bonus, minlength=n),
+            "deliveries": np.bincount(day_index, weights=session_counts, minlength=n),
+            "dash_minutes": np.bincount(day_index, weights=cols.dash_minutes[dated], minlength=n),
+            "active_minutes": np.bincount(day_index, weights=cols.active_minutes[dated], minlength=n),
+            "challenge_bonus": np.bincount(day_index, weights=bonus, minlength=n),
+        }
+        self.dates = self._rows(days, columns)
+
+    def _build_heatmap(self, cols: SessionColumns):
+        session_totals = np.bincount(cols.delivery_session, weights=cols.total, minlength=cols.n_sessions)
+        bonus = np.where(cols.has_bonus, cols.bonus, 0.0)
+        self.heatmap = HourlyHeatmap.build(cols.day, cols.start_minute, cols.end_minute, {
+            "earnings": session_totals + bonus,
+            "deliveries": np.diff(cols.offsets).astype(np.float64),
+            "dash_minutes": cols.dash_minutes,
+            "active_minutes": cols.active_minutes,
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable copy of every aggregate"""
+        return {
+            "totals": dict(self.totals),
+            "restaurants": self.restaurants,
+            "dates": {str(k): v for k, v in self.dates.items()},
+            "heatmap": self.heatmap.to_dict(),
+        }
+
+    def _build_rollups(self):
+        for granularity in self.rollups:
+            self.rollups[granularity] = period_totals(self.dates, granularity)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], to_number: Callable[[Any], float]) -> "RunningAggregates":
+        """Rebuild aggregates saved with ``to_dict``"""
+        agg = cls(to_number)
+        agg.totals.update(data["totals"])
+        agg.restaurants = data["restaurants"]
+        agg.dates = {int(k): v for k, v in data["dates"].items()}
+        agg._build_rollups()
+        agg.heatmap = HourlyHeatmap.from_dict(data["heatmap"])
+        return agg
+
+    @staticmethod
+    def _rows(keys: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[int, Dict[str, Any]]:
+        values = {name: column.tolist() for name, column in columns.items()}
+        return {
+            key: {name: values[name][i] for name in values}
+            for i, key in enumerate(keys.tolist())
+        }
+
+    def apply(self, session: Dict[str, Any], sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) one session's contribution"""
+        if not isinstance(session, RECORD_TYPES):
+            return
+        num = self.to_number
+        deliveries = [d for d in session.get("deliveries") or [] if isinstance(d, RECORD_TYPES)]
+        has_bonus = "challenge_bonus" in session
+        bonus = num(session.get("challenge_bonus", 0)) if has_bonus else 0.0
+        dash = num(session.get("dash_time_minutes", 0))
+        active = num(session.get("active_time_minutes", 0))
+        delivery_total = sum(num(d.get("total", 0)) for d in deliveries)
+
+        totals = self.totals
+        totals["sessions"] += sign
+        totals["earnings"] += sign * delivery_total
+        totals["deliveries"] += sign * len(deliveries)
+        totals["dash_minutes"] += sign * dash
+        totals["active_minutes"] += sign * active
+        if has_bonus:
+            totals["challenge_bonus"] += sign * bonus
+            totals["challenge_count"] += sign
+
+        label = session.get("date") if isinstance(session.get("date"), str) else ""
+        for delivery in deliveries:
+            name = delivery.get("restaurant", "Unknown")
+            stats = self.restaurants.get(name)
+            if stats is None:
+                stats = self.restaurants[name] = {
+                    "deliveries_count": 0,
+                    "total_earnings": 0.0,
+                    "base_pay_total": 0.0,
+                    "tips_total": 0.0,
+                    "dates": {},
+                }
+            stats["deliveries_count"] += sign
+            stats["total_earnings"] += sign * num(delivery.get("total", 0))
+            stats["base_pay_total"] += sign * num(delivery.get("doordash_pay", 0))
+            stats["tips_total"] += sign * num(delivery.get("tip", 0))
+            stats["dates"][label] = stats["dates"].get(label, 0) + sign
+            if stats["dates"][label] <= 0:
+                del stats["dates"][label]
+            if stats["deliveries_count"] <= 0:
+                del self.restaurants[name]
+
+        day = _day_number(session.get("date"))
+        if day == NO_DAY:
+            return
+        self._prefix = None
+
+        # Daily, rollup and heatmap totals count every delivery and bonus
+        delta = {
+            "earnings": delivery_total + bonus,
+            "deliveries": len(deliveries),
+            "dash_minutes": dash,
+            "active_minutes": active,
+            "challenge_bonus": bonus,
+        }
+        self._bump(self.dates, day, sign, delta)
+        for granularity, periods in self.rollups.items():
+            self._bump(periods, _period_start(day, granularity), sign, delta)
+        self.heatmap.apply(day, _minute_of_day(session.get("start_time")),
+                           _minute_of_day(session.get("end_time")), delta, sign)
+
+    @staticmethod
+    def _bump(table: Dict[int, Dict[str, Any]], key: int, sign: int, delta: Dict[str, float]):
+        row = table.get(key)
+        if row is None:
+            row = table[key] = _empty_period()
+        row["sessions"] += sign
+        for name, value in delta.items():
+            row[name] += sign * value
+        if row["sessions"] <= 0:
+            del table[key]
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals and averages across all sessions"""
+        return summary_response(self.totals)
+
+    def range_totals(self, start_day: int, end_day: int) -> Dict[str, Any]:
+        """Totals for sessions dated within ``[start_day, end_day]`` (day numbers)"""
+        prefix = self._prefix
+        if prefix is None:
+            prefix = self._prefix = DailyPrefixSums(self.dates)
+        return prefix.totals(start_day, end_day)
+
+    def restaurants_summary(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-restaurant totals sorted by earnings (descending)"""
+        return restaurants_response(self.restaurants, limit)
+
+    def locations(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Delivery counts per restaurant, most visited first"""
+        return locations_response(self.restaurants, limit)
+
+    def weekly(self) -> List[Dict[str, Any]]:
+        """Monday-based weekly totals in date order"""
+        return weekly_response(self.rollups["week"])
+
+    def rollup(self, granularity: str) -> List[Dict[str, Any]]:
+        """Totals per day, week, month, quarter or year in date order"""
+        return rollup_response(granularity, self.dates if granularity == "day" else self.rollups[granularity])
+
+    def heatmap_summary(self) -> Dict[str, Any]:
+        """Weekday x hour earnings per hour, deliveries and active ratio"""
+        return self.heatmap.response()
+
+
+# Response builders shared by every storage backend. Each takes running
+# sums in the shapes kept by RunningAggregates.
+
+def summary_response(totals: Dict[str, float]) -> Dict[str, Any]:
+    """Build the /api/summary payload from overall totals"""
+    challenge_bonus = totals["challenge_bonus"]
+    total_earnings = totals["earnings"] + challenge_bonus
+    total_deliveries = totals["deliveries"]
+    total_dash_minutes = totals["dash_minutes"]
+    total_active_minutes = totals["active_minutes"]
+
+    # Calculate averages (avoid division by zero)
+    avg_per_delivery = total_earnings / max(1, total_deliveries)
+    avg_per_hour = total_earnings / (total_dash_minutes / 60) if total_dash_minutes > 0 else 0
+    time_efficiency = (total_active_minutes / total_dash_minutes * 100) if total_dash_minutes > 0 else 0
+
+    return {
+        "total_earnings": round(total_earnings, 2),
+        "total_deliveries": total_deliveries,
+        "total_offers": total_deliveries,  # Add alias for compatibility
+        "total_dash_min": total_dash_minutes,
+        "total_active_min": total_active_minutes,
+        "avg_per_delivery": round(avg_per_delivery, 2),
+        "avg_per_hour": round(avg_per_hour, 2),
+        "time_efficiency": round(time_efficiency, 2),
+        "challenge_bonus_total": round(challenge_bonus, 2),
+    }
+
+
+def range_response(start_date: Optional[str], end_date: Optional[str], totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the /api/range payload from ``range_totals`` output"""
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": totals["days"],
+        "sessions": totals["sessions"],
+        "earnings": round(totals["earnings"] + totals["challenge_bonus"], 2),
+        "deliveries": totals["deliveries"],
+        "dash_minutes": totals["dash_minutes"],
+        "active_minutes": totals["active_minutes"],
+        "challenge_bonus": round(totals["challenge_bonus"], 2),
+    }
+
+
+def _top(restaurants: Dict[str, Dict[str, Any]], field: str, limit: Optional[int]):
+    """``(name, stats)`` pairs by ``field`` descending, ties in insertion order.
+
+    With a limit only the top entries are selected (a heap, not a full sort).
+    """
+    key = lambda item: item[1][field]
+    if limit is None:
+        return sorted(restaurants.items(), key=key, reverse=True)
+    return heapq.nlargest(max(0, limit), restaurants.items(), key=key)
+
+
+def restaurants_response(restaurants: Dict[str, Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Build the /api/restaurants payload from per-restaurant sums, sorted by earnings"""
+    restaurants_list = []
+    for name, stats in _top(restaurants, "total_earnings", limit):
+        count = stats["deliveries_count"]
+        restaurants_list.append({
+            'name': name,
+            'deliveries_count': count,
+            'total_earnings': stats["total_earnings"],
+            'base_pay_total': stats["base_pay_total"],
+            'tips_total': stats["tips_total"],
+            'dates': list(stats["dates"]),
+            'avg_per_delivery': round(stats["total_earnings"] / count, 2) if count > 0 else 0,
+            'visit_count': len(stats["dates"]),
+        })
+    return restaurants_list
+
+
+def locations_response(restaurants: Dict[str, Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Build the /api/locations payload from per-restaurant sums, most visited first"""
+    return [{'name': name, 'count': stats["deliveries_count"]}
+            for name, stats in _top(restaurants, "deliveries_count", limit)]
+
+
+def weekly_response(weeks: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build the /api/weekly payload from totals keyed by Monday day number"""
+    starts = sorted(weeks)
+    if not starts:
+        return []
+
+    # ISO week number: the week's Thursday decides which year it belongs to
+    monday = (np.asarray(starts, dtype=np.int64) - EPOCH_DAY).astype('datetime64[D]')
+    thursday = monday + 3
+    year_start = thursday.astype('datetime64[Y]').astype('datetime64[D]')
+    week_numbers = ((thursday - year_start).astype(np.int64) // 7 + 1).tolist()
+    start_dates = np.datetime_as_string(monday).tolist()
+    end_dates = np.datetime_as_string(monday + 6).tolist()
+
+    weekly_data = []
+    for i, start in enumerate(starts):
+        row = weeks[start]
+        weekly_data.append({
+            'id': i + 1,
+            'week_number': week_numbers[i],
+            'start_date': start_dates[i],
+            'end_date': end_dates[i],
+            'earnings': row["earnings"],
+            'deliveries': row["deliveries"],
+            'dash_minutes': row["dash_minutes"],
+            'active_minutes': row["active_minutes"],
+            'gas': 0,
+            'challenge_bonus': row["challenge_bonus"],
+        })
+    return weekly_data
+
+
+def _period_labels(first: np.ndarray, granularity: str) -> List[str]:
+    """Labels like 2024-03-05, 2024-W10, 2024-03, 2024-Q1 or 2024 for period start dates"""
+    if granularity == "week":
+        # ISO week number: the week's Thursday decides which year it belongs to
+        thursday = first + 3
+        year_start = thursday.astype('datetime64[Y]')
+        weeks = ((thursday - year_start.astype('datetime64[D]')).astype(np.int64) // 7 + 1).tolist()
+        years = np.datetime_as_string(year_start).tolist()
+        return [f"{year}-W{week:02d}" for year, week in zip(years, weeks)]
+    if granularity == "quarter":
+        months = first.astype('datetime64[M]').astype(np.int64)
+        years = np.datetime_as_string(first.astype('datetime64[Y]')).tolist()
+        return [f"{year}-Q{month % 12 // 3 + 1}" for year, month in zip(years, months.tolist())]
+    unit = {"day": "D", "month": "M", "year": "Y"}[granularity]
+    return np.datetime_as_string(first, unit=unit).tolist()
+
+
+def rollup_response(granularity: str, periods: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build the /api/rollup payload from totals keyed by period start day number"""
+    starts = sorted(periods)
+    if not starts:
+        return []
+
+    first = (np.asarray(starts, dtype=np.int64) - EPOCH_DAY).astype('datetime64[D]')
+    if granularity == "day":
+        last = first
+    elif granularity == "week":
+        last = first + 6
+    else:
+        last = (first.astype('datetime64[M]') + _MONTHS[granularity]).astype('datetime64[D]') - 1
+    labels = _period_labels(first, granularity)
+    start_dates = np.datetime_as_string(first).tolist()
+    end_dates = np.datetime_as_string(last).tolist()
+
+    rollup_data = []
+    for i, start in enumerate(starts):
+        row = periods[start]
+        dash_minutes = row["dash_minutes"]
+        rollup_data.append({
+            'period': labels[i],
+            'start_date': start_dates[i],
+            'end_date': end_dates[i],
+            'sessions': row["sessions"],
+            'earnings': round(row["earnings"], 2),
+            'deliveries': int(round(row["deliveries"])),
+            'dash_minutes': dash_minutes,
+            'active_minutes': row["active_minutes"],
+            'challenge_bonus': round(row["challenge_bonus"], 2),
+            'avg_per_hour': round(row["earnings"] / (dash_minutes / 60), 2) if dash_minutes > 0 else 0,
+        })
+    return rollup_data
+
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def heatmap_response(sessions: int, cells: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Build the /api/heatmap payload from 168 hourly cells per field, Monday 00:00 first"""
+    grid = {name: np.asarray(values, dtype=np.float64).reshape(7, 24) for name, values in cells.items()}
+    dash = grid["dash_minutes"]
+    # Cells emptied by deletes keep a little float noise
+    worked = dash > 1e-6
+    safe_dash = np.where(worked, dash, 1.0)
+
+    def cells_of(values: np.ndarray, digits: int) -> List[List[float]]:
+        # + 0.0 turns a rounded -0.0 into 0.0
+        return (np.round(values, digits) + 0.0).tolist()
+
+    return {
+        "weekdays": list(WEEKDAYS),
+        "hours": list(range(24)),
+        "sessions": sessions,
+        "earnings_per_hour": cells_of(np.where(worked, grid["earnings"] / (safe_dash / 60), 0.0), 2),
+        "deliveries": cells_of(grid["deliveries"], 2),
+        "active_ratio": cells_of(np.where(worked, grid["active_minutes"] / safe_dash, 0.0), 3),
+        "dash_minutes": cells_of(dash, 1),
+        "earnings": cells_of(grid["earnings"], 2),
+    }
@@ -1,16 +1,57 @@
+from contextlib import contextmanager
 from pathlib import Path
 import json
-import bcrypt
+import os
+import threading
 from typing import Dict, Optional
 from datetime import datetime
-from config.settings import USERS_FILE
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from config.settings import USERS_FILE, WATCH_DATA_FILES
+from core.file_watch import FileWatcher, file_signature
+from core.journal import write_snapshot_tmp
+from core.password_hasher import PasswordHasher
 
 class AuthService:
-    def __init__(self, users_file=USERS_FILE):
+    """Users from users.json, held in memory and indexed by username.
+
+    The file is re-read only after it changes (inotify where available,
+    otherwise a stat per call), so profile lookups are a dict lookup.
+    """
+
+    def __init__(self, users_file=USERS_FILE, watch_files: bool = WATCH_DATA_FILES,
+                 hasher: Optional[PasswordHasher] = None):
         self.users_file = users_file
-        
+        # bcrypt runs on a bounded pool; raises AuthBusy when it's full
+        self.hasher = hasher or PasswordHasher()
+        self._users_data = None
+        self._by_username: Dict[str, Dict] = {}
+        self._next_id = 1
+        # Signature (mtime_ns, size, inode) of the file we loaded
+        self._signature = None
+        self._lock = threading.RLock()
+        self._watcher = FileWatcher([Path(users_file)], use_inotify=watch_files)
+
     def load_users(self):
-        """Load users from JSON file"""
+        """Load users from JSON file (cached until the file changes)"""
+        with self._lock:
+            if self._users_data is None or self._watcher.poll():
+                self._refresh()
+            return self._users_data
+
+    def _refresh(self):
+        """Re-read the file if its signature differs from the loaded copy"""
+        signature = file_signature(Path(self.users_file))
+        if self._users_data is not None and signature is not None and signature == self._signature:
+            return
+        self._signature = signature
+        self._use(self._read_users())
+
+    def _read_users(self):
         try:
             if not Path(self.users_file).exists():
                 # Create directory if it doesn't exist
@@ -19,63 +60,96 @@ class AuthService:
                 with open(self.users_file, 'w') as f:
                     json.dump({"users": []}, f)
                 return {"users": []}
-            
+
             with open(self.users_file, 'r') as f:
                 return json.load(f)
         except Exception as e:
             print(f"Error loading users: {e}")
+            # Retry the file on the next call
+            self._signature = None
+            self._watcher.invalidate()
             return {"users": []}
-    
+
+    def _use(self, users_data):
+        """Hold ``users_data`` and rebuild the username index"""
+        by_username = {}
+        for user in users_data.get('users', []):
+            # The first entry wins if a name was ever stored twice
+            by_username.setdefault(user.get('username'), user)
+        self._by_username = by_username
+        self._next_id = max((u.get('id', 0) for u in users_data.get('users', [])), default=0) + 1
+        self._users_data = users_data
+
+    @contextmanager
+    def _locked(self):
+        """Serialize writers in this and other processes (``flock`` on a side file)"""
+        with self._lock:
+            Path(self.users_file).parent.mkdir(parents=True, exist_ok=True)
+            with open(f"{self.users_file}.lock", 'a+b') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
     def save_users(self, users_data):
-        """Save users to JSON file"""
-        # Create directory if it doesn't exist
-        Path(self.users_file).parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(self.users_file, 'w') as f:
-            json.dump(users_data, f, indent=2)
-    
+        """Save users to JSON file atomically"""
+        with self._lock:
+            # Create directory if it doesn't exist
+            Path(self.users_file).parent.mkdir(parents=True, exist_ok=True)
+
+            # Readers never see a half-written file
+            os.replace(write_snapshot_tmp(self.users_file, users_data), self.users_file)
+            self._signature = file_signature(Path(self.users_file))
+            self._use(users_data)
+
     def register_user(self, username, password, email, is_admin=False):
         """Register a new user"""
-        users_data = self.load_users()
-        
-        # Check if username already exists
-        if any(u.get('username') == username for u in users_data.get('users', [])):
+        self.load_users()
+        if username in self._by_username:
             return {"success": False, "message": "Username already exists"}
-        
+
         # Hash password
-        hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        
-        # Generate new user id
-        next_id = 1
-        if users_data.get('users'):
-            next_id = max(u.get('id', 0) for u in users_data.get('users', [])) + 1
-        
-        # Create new user
-        new_user = {
-            "id": next_id,
-            "username": username,
-            "password": hashed_pw.decode('utf-8'),
-            "email": email,
-            "created_at": datetime.now().isoformat(),
-            "is_admin": is_admin
-        }
-        
-        users_data['users'].append(new_user)
-        self.save_users(users_data)
-        
+        hashed_pw = self.hasher.hash(password)
+
+        with self._locked():
+            # Another process may have registered someone since we last looked
+            self._refresh()
+            users_data = self._users_data
+
+            # Check if username already exists
+            if username in self._by_username:
+                return {"success": False, "message": "Username already exists"}
+
+            # Create new user
+            new_user = {
+                "id": self._next_id,
+                "username": username,
+                "password": hashed_pw,
+                "email": email,
+                "created_at": datetime.now().isoformat(),
+                "is_admin": is_admin
+            }
+
+            self.save_users({**users_data, "users": users_data.get('users', []) + [new_user]})
+
         # Return user without password
         user_info = {k: v for k, v in new_user.items() if k != 'password'}
         return {"success": True, "user": user_info}
-    
+
+    def get_user(self, username) -> Optional[Dict]:
+        """User info without the password, or None"""
+        self.load_users()
+        user = self._by_username.get(username)
+        if user is None:
+            return None
+        return {k: v for k, v in user.items() if k != 'password'}
+
     def validate_user(self, username, password):
         """Validate username and password"""
-        users_data = self.load_users()
-        
-        for user in users_data.get('users', []):
-            if user.get('username') == username:
-                stored_pw = user.get('password', '').encode('utf-8')
-                if bcrypt.checkpw(password.encode('utf-8'), stored_pw):
-                    # Return user info without password
-                    return {k: v for k, v in user.items() if k != 'password'}
-        
-        return None
\ No newline at end of file
+        self.load_users()
+        user = self._by_username.get(username)
+        if user is not None:
+            if self.hasher.check(password, user.get('password', '')):
+                # Return user info without password
+                return {k: v for k, v in user.items() if k != 'password'}
+
+        return None
@@ -0,0 +1,101 @@
+"""
+JSON codec used for the data files, the journal and API responses.
+
+orjson (or msgspec) is used when installed; both parse faster than the
+stdlib and serialize straight to bytes. Without either, everything falls
+back to the stdlib ``json`` module with the same behaviour.
+
+Decoding yields plain dicts and lists, not typed records, and does no
+numeric coercion. Currency strings are converted afterwards by
+``to_number`` when the data service normalizes each session, and
+``models.to_session`` then builds the slotted records.
+"""
+import json
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+
+def _default(obj):
+    """Serialize records (and anything else with ``to_dict``) as dicts"""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
+
+
+if msgspec is not None:
+    _msgspec_decoder = msgspec.json.Decoder()
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_default)
+
+
+def loads(data) -> Any:
+    """Parse JSON from ``bytes`` or ``str``"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return _msgspec_decoder.decode(data.encode("utf-8") if isinstance(data, str) else data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes; ``indent`` uses two spaces like ``json.dump(indent=2)``"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    if msgspec is not None and not indent and not sort_keys:
+        return _msgspec_encoder.encode(obj)
+    if indent:
+        return json.dumps(obj, indent=2, sort_keys=sort_keys, default=_default).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys, default=_default).encode("utf-8")
+
+
+def load_file(path: Path) -> Any:
+    """Parse a whole JSON file"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def to_number(value) -> float:
+    """Convert a JSON value to float, accepting currency strings like ``"$1,234.50"``"""
+    kind = type(value)
+    if kind is float:
+        return value
+    if kind is int:
+        return float(value)
+    if kind is str:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        # Remove any currency symbols or commas
+        clean_value = value.replace("$", "").replace(",", "").strip()
+        try:
+            return float(clean_value)
+        except ValueError:
+            print(f"Warning: Could not convert '{value}' to a number, using 0")
+            return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    # For None or other types
+    return 0.0
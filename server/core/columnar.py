@@ -0,0 +1,256 @@
+from datetime import date
+from typing import Dict, Any, List, Callable
+
+import numpy as np
+
+from core.models import RECORD_TYPES, is_session_id
+
+# Day number used for sessions whose date is missing or unparseable
+NO_DAY = -1
+
+# Day number of 1970-01-01, for converting day numbers to datetime64
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def _day_number(value) -> int:
+    """Convert a YYYY-MM-DD string to a proleptic ordinal day number"""
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return NO_DAY
+
+
+# Session id column value for sessions without a valid id
+NO_SESSION_ID = -1
+
+# Minute of day used for start/end times that are missing or unparseable
+NO_MINUTE = -1
+
+
+def _minute_of_day(value) -> int:
+    """Convert an HH:MM (or HH:MM:SS) string to minutes since midnight"""
+    if not isinstance(value, str):
+        return NO_MINUTE
+    parts = value.strip().split(":")
+    if len(parts) not in (2, 3):
+        return NO_MINUTE
+    try:
+        hour, minute = int(parts[0]), int(parts[1])
+    except ValueError:
+        return NO_MINUTE
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return NO_MINUTE
+    return hour * 60 + minute
+
+
+def _merge_names(names: List[str], more: List[str]):
+    """``names`` followed by the new ones in ``more``, and each of ``more``'s merged id"""
+    ids = {name: i for i, name in enumerate(names)}
+    merged = list(names)
+    mapping = np.zeros(len(more), dtype=np.int32)
+    for i, name in enumerate(more):
+        if name not in ids:
+            ids[name] = len(merged)
+            merged.append(name)
+        mapping[i] = ids[name]
+    return merged, mapping
+
+
+def _first_used(names: List[str], ids: np.ndarray):
+    """The names ``ids`` refer to in order of first use, and ``ids`` renumbered to match"""
+    used, first = np.unique(ids, return_index=True)
+    used = used[np.argsort(first, kind='stable')]
+    renumber = np.zeros(len(names), dtype=np.int32)
+    renumber[used] = np.arange(len(used), dtype=np.int32)
+    return [names[i] for i in used.tolist()], renumber[ids]
+
+
+class SessionColumns:
+    """Column-oriented copy of the sessions file.
+
+    Per-session values live in arrays of length ``n_sessions`` and
+    per-delivery values in arrays of length ``n_deliveries``. Deliveries are
+    stored session by session, so ``offsets[i]:offsets[i + 1]`` selects the
+    deliveries of session ``i`` and ``delivery_session`` maps back.
+    Restaurant and merchant type names are stored once in ``restaurants`` /
+    ``merchant_types`` and referenced by integer id.
+    """
+
+    # Arrays copied as-is when sessions are appended or selected
+    SESSION_COLUMNS = ("session_id", "day", "start_minute", "end_minute", "dash_minutes", "active_minutes",
+                       "bonus", "earnings", "deliveries_count", "has_date", "has_bonus", "has_deliveries",
+                       "has_times")
+    DELIVERY_COLUMNS = ("pay", "tip", "total")
+
+    def __init__(self):
+        # Session columns
+        self.labels: List[str] = []
+        self.session_id = np.zeros(0, dtype=np.int64)
+        self.day = np.zeros(0, dtype=np.int32)
+        self.dash_minutes = np.zeros(0)
+        self.active_minutes = np.zeros(0)
+        self.bonus = np.zeros(0)
+        self.earnings = np.zeros(0)
+        self.deliveries_count = np.zeros(0)
+        self.has_date = np.zeros(0, dtype=bool)
+        self.has_bonus = np.zeros(0, dtype=bool)
+        self.has_deliveries = np.zeros(0, dtype=bool)
+        self.has_times = np.zeros(0, dtype=bool)
+        # start_time / end_time as minutes since midnight, NO_MINUTE if absent
+        self.start_minute = np.zeros(0, dtype=np.int16)
+        self.end_minute = np.zeros(0, dtype=np.int16)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+        # Delivery columns
+        self.pay = np.zeros(0)
+        self.tip = np.zeros(0)
+        self.total = np.zeros(0)
+        self.restaurant_id = np.zeros(0, dtype=np.int32)
+        self.merchant_type_id = np.zeros(0, dtype=np.int32)
+        self.delivery_session = np.zeros(0, dtype=np.int32)
+
+        # String tables
+        self.restaurants: List[str] = []
+        self.merchant_types: List[str] = []
+
+    @property
+    def n_sessions(self) -> int:
+        return len(self.labels)
+
+    @property
+    def n_deliveries(self) -> int:
+        return len(self.total)
+
+    @classmethod
+    def from_sessions(cls, sessions: List[Dict[str, Any]], to_number: Callable[[Any], float]) -> "SessionColumns":
+        """Build the columns from already-normalized session dicts"""
+        cols = cls()
+        restaurant_ids: Dict[str, int] = {}
+        merchant_type_ids: Dict[str, int] = {}
+
+        labels, session_ids, day, start_minute, end_minute = [], [], [], [], []
+        dash, active, bonus, earnings, counts = [], [], [], [], []
+        has_date, has_bonus, has_deliveries, has_times = [], [], [], []
+        offsets = [0]
+        pay, tip, total, rest_id, type_id, owner = [], [], [], [], [], []
+
+        for index, session in enumerate(s for s in sessions if isinstance(s, RECORD_TYPES)):
+            session_id = session.get("id")
+            session_ids.append(session_id if is_session_id(session_id) else NO_SESSION_ID)
+            session_date = session.get("date")
+            labels.append(session_date if isinstance(session_date, str) else "")
+            day.append(_day_number(session_date))
+            has_date.append("date" in session)
+            start_minute.append(_minute_of_day(session.get("start_time")))
+            end_minute.append(_minute_of_day(session.get("end_time")))
+
+            dash.append(to_number(session.get("dash_time_minutes", 0)))
+            active.append(to_number(session.get("active_time_minutes", 0)))
+            has_times.append("dash_time_minutes" in session and "active_time_minutes" in session)
+            has_bonus.append("challenge_bonus" in session)
+            bonus.append(to_number(session.get("challenge_bonus", 0)))
+            has_deliveries.append("deliveries" in session)
+
+            deliveries = session.get("deliveries") or []
+            session_total = 0.0
+            for delivery in deliveries:
+                if not isinstance(delivery, RECORD_TYPES):
+                    continue
+                name = delivery.get("restaurant", "Unknown")
+                kind = delivery.get("merchant_type", "Restaurant")
+                amount = to_number(delivery.get("total", 0))
+                pay.append(to_number(delivery.get("doordash_pay", 0)))
+                tip.append(to_number(delivery.get("tip", 0)))
+                total.append(amount)
+                rest_id.append(restaurant_ids.setdefault(name, len(restaurant_ids)))
+                type_id.append(merchant_type_ids.setdefault(kind, len(merchant_type_ids)))
+                owner.append(index)
+                session_total += amount
+            offsets.append(len(total))
+
+            if isinstance(session.get("earnings"), (int, float)):
+                earnings.append(float(session["earnings"]))
+            else:
+                earnings.append(session_total)
+            counts.append(to_number(session.get("deliveries_count", 0)))
+
+        cols.labels = labels
+        cols.session_id = np.asarray(session_ids, dtype=np.int64)
+        cols.day = np.asarray(day, dtype=np.int32)
+        cols.start_minute = np.asarray(start_minute, dtype=np.int16)
+        cols.end_minute = np.asarray(end_minute, dtype=np.int16)
+        cols.dash_minutes = np.asarray(dash, dtype=np.float64)
+        cols.active_minutes = np.asarray(active, dtype=np.float64)
+        cols.bonus = np.asarray(bonus, dtype=np.float64)
+        cols.earnings = np.asarray(earnings, dtype=np.float64)
+        cols.deliveries_count = np.asarray(counts, dtype=np.float64)
+        cols.has_date = np.asarray(has_date, dtype=bool)
+        cols.has_bonus = np.asarray(has_bonus, dtype=bool)
+        cols.has_deliveries = np.asarray(has_deliveries, dtype=bool)
+        cols.has_times = np.asarray(has_times, dtype=bool)
+        cols.offsets = np.asarray(offsets, dtype=np.int64)
+
+        cols.pay = np.asarray(pay, dtype=np.float64)
+        cols.tip = np.asarray(tip, dtype=np.float64)
+        cols.total = np.asarray(total, dtype=np.float64)
+        cols.restaurant_id = np.asarray(rest_id, dtype=np.int32)
+        cols.merchant_type_id = np.asarray(type_id, dtype=np.int32)
+        cols.delivery_session = np.asarray(owner, dtype=np.int32)
+
+        cols.restaurants = list(restaurant_ids)
+        cols.merchant_types = list(merchant_type_ids)
+        return cols
+
+    def concat(self, other: "SessionColumns") -> "SessionColumns":
+        """These sessions followed by ``other``'s, without re-reading either"""
+        cols = SessionColumns()
+        cols.labels = self.labels + other.labels
+        for name in self.SESSION_COLUMNS + self.DELIVERY_COLUMNS:
+            setattr(cols, name, np.concatenate((getattr(self, name), getattr(other, name))))
+        cols.offsets = np.concatenate((self.offsets, other.offsets[1:] + self.offsets[-1]))
+        cols.delivery_session = np.concatenate(
+            (self.delivery_session, other.delivery_session + np.int32(self.n_sessions)))
+
+        # Both name tables are in order of first use, so appending the new names keeps that order
+        cols.restaurants, restaurant_ids = _merge_names(self.restaurants, other.restaurants)
+        cols.restaurant_id = np.concatenate((self.restaurant_id, restaurant_ids[other.restaurant_id]))
+        cols.merchant_types, merchant_type_ids = _merge_names(self.merchant_types, other.merchant_types)
+        cols.merchant_type_id = np.concatenate((self.merchant_type_id, merchant_type_ids[other.merchant_type_id]))
+        return cols
+
+    def take(self, rows: np.ndarray) -> "SessionColumns":
+        """The sessions at ascending positions ``rows``, with their deliveries"""
+        cols = SessionColumns()
+        labels = self.labels
+        cols.labels = [labels[i] for i in rows.tolist()]
+        for name in self.SESSION_COLUMNS:
+            setattr(cols, name, getattr(self, name)[rows])
+
+        keep = np.zeros(self.n_sessions, dtype=bool)
+        keep[rows] = True
+        delivered = keep[self.delivery_session]
+        for name in self.DELIVERY_COLUMNS:
+            setattr(cols, name, getattr(self, name)[delivered])
+        counts = np.diff(self.offsets)[rows]
+        cols.offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(counts, out=cols.offsets[1:])
+        cols.delivery_session = np.repeat(np.arange(len(rows), dtype=np.int32), counts)
+
+        # Drop names no longer referenced, as a rebuild would
+        cols.restaurants, cols.restaurant_id = _first_used(self.restaurants, self.restaurant_id[delivered])
+        cols.merchant_types, cols.merchant_type_id = _first_used(self.merchant_types,
+                                                                 self.merchant_type_id[delivered])
+        return cols
+
+    def timeseries(self) -> Dict[str, List]:
+        """Per-session chart series ordered by date"""
+        rows = np.flatnonzero(self.has_date)
+        rows = rows[np.argsort(self.day[rows], kind='stable')]
+        labels = self.labels
+        return {
+            "labels": [labels[i] for i in rows.tolist()],
+            "earnings": np.round(self.earnings[rows], 2).tolist(),
+            "deliveries": self.deliveries_count[rows].astype(np.int64).tolist(),
+            "dash_time": self.dash_minutes[rows].tolist(),
+            "active_time": self.active_minutes[rows].tolist(),
+        }
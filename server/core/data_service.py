@@ -1,170 +1,698 @@
-import json
+import hashlib
+from itertools import groupby
 from pathlib import Path
-from datetime import datetime
+from concurrent.futures import Future
 import os
+import queue
 import threading
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import JOURNAL_MAX_RECORDS, JOURNAL_MAX_BYTES, WATCH_DATA_FILES, BINARY_SNAPSHOT, WRITE_BATCH_MAX
+from core.columnar import SessionColumns
+from core.aggregates import RunningAggregates, day_range, summary_response
+from core.journal import JOURNAL_START, SessionJournal, write_snapshot_tmp
+from core.file_watch import FileWatcher, file_signature
+from core.aggregate_cache import AggregateCache
+from core.codec import load_file, to_number
+from core.merchant_types import classify_merchant
+from core.models import RECORD_TYPES, is_session_id, to_session
+from core.session_index import SessionIndex, SessionKey, SessionPage
+from core.snapshot import BinarySnapshot, SnapshotData, SnapshotGeneration, SnapshotView
 
 class DoorDashDataService:
-    def __init__(self, data_file: Path):
+    def __init__(self, data_file: Path,
+                 journal_max_records: int = JOURNAL_MAX_RECORDS,
+                 journal_max_bytes: int = JOURNAL_MAX_BYTES,
+                 watch_files: bool = WATCH_DATA_FILES,
+                 binary_snapshot: bool = BINARY_SNAPSHOT):
         self.data_file = data_file
         self.cache_file = data_file.parent / "cache.json"
+        self.aggregate_cache = AggregateCache(self.cache_file)
+        self.journal = SessionJournal(data_file.with_name(data_file.stem + ".journal.jsonl"))
+        self.binary_snapshot = BinarySnapshot(data_file.with_suffix(".snapshot")) if binary_snapshot else None
+        self.generation = SnapshotGeneration(data_file.with_suffix(".generation")) if binary_snapshot else None
+        self.journal_max_records = journal_max_records
+        self.journal_max_bytes = journal_max_bytes
         self._data = None
-        self._last_load_time = 0
-        self.load_data()
+        self._columns = None
+        # Adds/deletes applied to the sessions but not yet to ``_columns``,
+        # as ("add", session) / ("delete", position); folded in by columns()
+        self._column_changes = []
+        self._aggregates = None
+        # Last journal seq the running aggregates include
+        self._aggregates_seq = 0
+        self._index = None
+        # Sessions held as a view of the binary snapshot mapping shared by
+        # all workers, instead of decoded records; None if decoded
+        self._shared = None
+        # Last snapshot generation this process has caught up with
+        self._generation_seen = 0
+        # When the aggregates were last brought in sync with the data
+        self._aggregates_time = 0.0
+        # Signature (mtime_ns, size, inode) of the snapshot we loaded
+        self._snapshot_sig = None
+        self._watcher = FileWatcher([self.data_file, self.journal.path], use_inotify=watch_files)
+        # Journal position: file and byte offset read up to, last seq in the
+        # snapshot / applied, and records not yet compacted
+        self._journal_pos = JOURNAL_START
+        self._snapshot_seq = 0
+        self._journal_seq = 0
+        self._journal_records = 0
+        # Id for the next added session (one past the largest seen)
+        self._next_session_id = 1
+        # Bumped on every reload or mutation; drives HTTP validators
+        self._version = 0
+        self._modified_time = 0.0
+        self._write_lock = threading.RLock()
+        self._compacting = False
+        # Mutations waiting for the writer thread, as (op, future) pairs
+        self._pending = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._load()
+        self._maybe_compact()
     
     def load_data(self) -> Dict[str, Any]:
-        """Load data from file with file change detection"""
+        """Load snapshot plus journal, with file change detection.
+
+        Sessions held in the shared snapshot are decoded into a new list
+        for the caller rather than kept in this process.
+        """
+        data = self._load()
+        try:
+            if self._shared is not None:
+                return {**data, "sessions": self._shared.sessions()}
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return {"sessions": [], "currency": "USD"}
+        return data
+    
+    def _load(self, verify: bool = False) -> Dict[str, Any]:
+        """Bring the loaded data up to date without decoding shared sessions.
+
+        ``verify`` skips the change-notification shortcut. Writers holding
+        the journal lock need it: inotify events arrive asynchronously, so
+        another process's append may not have been reported yet.
+        """
         try:
-            current_mtime = os.path.getmtime(self.data_file)
+            generation = self.generation.value() if self.generation else 0
+            if (not verify and self._data is not None and generation == self._generation_seen
+                    and not self._watcher.poll()):
+                # No newer snapshot published and inotify saw nothing touch the files
+                return self._data
             
-            # Only reload if file has changed or not loaded yet
-            if self._data is None or current_mtime > self._last_load_time:
-                with open(self.data_file, 'r') as f:
-                    self._data = json.load(f)
-                self._last_load_time = current_mtime
+            # One thread catches up at a time, so no record is applied twice
+            with self._write_lock:
+                signature = file_signature(self.data_file)
+                if signature is None:
+                    raise FileNotFoundError(f"No such file: '{self.data_file}'")
                 
-                # Process the data to add derived fields
-                self._process_data()
+                # Only reload if the snapshot has changed or not loaded yet
+                if self._data is None or signature != self._snapshot_sig:
+                    self._reload(signature)
+                elif self.journal.position() != self._journal_pos:
+                    # Another process appended to the journal; apply only the new records
+                    self._replay_journal()
+                    self._mark_changed(self._journal_mtime())
+                self._generation_seen = generation
                 
-            return self._data
+                return self._data
         except Exception as e:
             print(f"Error loading data: {e}")
+            # Retry the file on the next call
+            self._watcher.invalidate()
             # Return empty data structure to prevent crashes
             return {"sessions": [], "currency": "USD"}
     
+    def _reload(self, signature):
+        """Load the binary snapshot for ``signature``, or parse the JSON file and snapshot it"""
+        previous_seq = self._snapshot_seq
+        self._snapshot_sig = signature
+        mapped = self.binary_snapshot.load(signature) if self.binary_snapshot else None
+        columns = None
+        if mapped is None:
+            data = load_file(self.data_file)
+            journal_seq = data.pop("journal_seq", 0)
+            
+            # Process the data to add derived fields, then hold the sessions
+            # as compact slotted records instead of dicts
+            self._data = data
+            self._process_data()
+            data["sessions"] = [to_session(s) for s in data.get("sessions", [])]
+            self._number_sessions(data["sessions"])
+            columns = self._columns_for(data["sessions"])
+            if self._save_binary_snapshot(data, journal_seq, signature, columns):
+                # Serve from the shared mapping rather than this private copy
+                mapped = self.binary_snapshot.load(signature)
+        if mapped is not None:
+            journal_seq = mapped.journal_seq
+        if not (self._aggregates is not None and previous_seq < journal_seq <= self._aggregates_seq):
+            # Not just a compaction of changes the running totals include; rebuild them
+            self._aggregates = None
+        if mapped is not None:
+            self._use_snapshot(mapped)
+        else:
+            self._shared = None
+            self._set_columns(columns)
+            self._index = None
+            self._snapshot_seq = self._journal_seq = journal_seq
+        self._next_session_id = int(self._columns.session_id.max(initial=0)) + 1
+        self._catch_up(signature.mtime_ns / 1e9)
+    
+    def _use_snapshot(self, mapped: SnapshotData):
+        """Serve the sessions from a mapped binary snapshot"""
+        self._data = dict(mapped.meta)
+        self._shared = SnapshotView(mapped)
+        self._set_columns(mapped.columns())
+        self._index = None
+        self._snapshot_seq = self._journal_seq = mapped.journal_seq
+    
+    def _catch_up(self, modified_time: float):
+        """Replay the journal past the loaded snapshot and rebuild the running aggregates if dropped"""
+        # Replay mutations that haven't been folded into the snapshot yet
+        self._journal_pos = JOURNAL_START
+        self._journal_records = 0
+        self._replay_journal()
+        
+        if self._aggregates is None:
+            # Reuse the worker's materialized aggregates if they match this data
+            cached = self.aggregate_cache.load(self.data_version(), self._ensure_numeric)
+            if cached is not None:
+                self._aggregates, self._aggregates_time = cached
+            else:
+                # Build the running aggregates from the columnar copy
+                self._aggregates = RunningAggregates.from_columns(self._current_columns(), self._ensure_numeric)
+                self._aggregates_time = time.time()
+            self._aggregates_seq = self._journal_seq
+        
+        self._mark_changed(max(modified_time, self._journal_mtime()))
+    
+    def _replay_journal(self):
+        """Apply journal records past the current position"""
+        start = self._journal_pos
+        records, self._journal_pos = self.journal.read_from(start)
+        if self._journal_pos.inode != start.inode:
+            # A compacted journal, read from its start
+            self._journal_records = 0
+        self._journal_records += len(records)
+        pending = []
+        for record in records:
+            seq = record.get("seq", 0)
+            if seq <= self._journal_seq:
+                # Folded into the snapshot, or applied before the journal was compacted
+                continue
+            self._journal_seq = seq
+            pending.append(record)
+        self._apply_records(pending)
+    
+    @staticmethod
+    def _number_sessions(sessions: List[Dict[str, Any]]):
+        """Give each session without a usable id (missing, invalid or already
+        taken) the next one past the largest id, in file order"""
+        taken, unnumbered = set(), []
+        for session in sessions:
+            if not isinstance(session, RECORD_TYPES):
+                continue
+            session_id = session.get("id")
+            if is_session_id(session_id) and session_id not in taken:
+                taken.add(session_id)
+            else:
+                unnumbered.append(session)
+        next_id = max(taken, default=0) + 1
+        for session in unnumbered:
+            session["id"] = next_id
+            next_id += 1
+    
+    def _sessions(self) -> List[Dict[str, Any]]:
+        """The loaded sessions as a list, decoded if they're held in a snapshot"""
+        if self._shared is not None:
+            return self._shared.sessions()
+        return self._data["sessions"]
+    
+    def _position_of(self, session_id) -> Optional[int]:
+        """Position in the sessions list of the session with ``session_id``, or None"""
+        if not is_session_id(session_id):
+            return None
+        matches = np.flatnonzero(self._current_columns().session_id == session_id)
+        return int(matches[0]) if len(matches) else None
+    
+    def _save_binary_snapshot(self, data: Dict[str, Any], journal_seq: int, source, columns: SessionColumns) -> bool:
+        if self.binary_snapshot is None:
+            return False
+        return self.binary_snapshot.write(data, journal_seq, source, columns)
+    
+    def _apply_records(self, records: List[Dict[str, Any]]):
+        """Apply records in order"""
+        for record in records:
+            self._apply_record(record)
+    
+    def _apply_record(self, record: Dict[str, Any]):
+        """Apply one add/delete record to the loaded sessions, index, columns and running totals"""
+        sessions = self._shared if self._shared is not None else self._data["sessions"]
+        # Totals carried over a compaction may already include the record
+        seq = record.get("seq", 0)
+        totals = self._aggregates if seq > self._aggregates_seq else None
+        if record.get("op") == "add":
+            session = record["session"]
+            if not (is_session_id(session.get("id")) and session["id"] >= self._next_session_id):
+                # Journaled before sessions had ids; number it as a commit would
+                session["id"] = self._next_session_id
+            self._next_session_id = session["id"] + 1
+            self._process_session(session)
+            session = to_session(session)
+            sessions.append(session)
+            self._queue_column_change("add", session)
+            if self._index is not None:
+                self._index.add(session)
+            if totals is not None:
+                totals.apply(session, 1)
+        elif record.get("op") == "delete":
+            if "id" in record:
+                index = self._position_of(record["id"])
+            else:
+                # Journaled before deletes named the session by id
+                index = record.get("index")
+            if index is not None and 0 <= index < len(sessions):
+                removed = sessions.pop(index)
+                self._queue_column_change("delete", index)
+                if self._index is not None:
+                    self._index.remove(index)
+                if totals is not None:
+                    totals.apply(removed, -1)
+        if totals is not None:
+            self._aggregates_seq = seq
+            self._aggregates_time = time.time()
+    
+    def _mark_changed(self, modified_time: float):
+        self._version += 1
+        self._modified_time = max(self._modified_time, modified_time)
+    
+    def _journal_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.journal.path)
+        except OSError:
+            return 0.0
+    
+    def _build_columns(self) -> SessionColumns:
+        return self._columns_for(self._sessions())
+    
+    def _columns_for(self, sessions: List[Dict[str, Any]]) -> SessionColumns:
+        return SessionColumns.from_sessions(sessions, self._ensure_numeric)
+    
+    def _set_columns(self, columns: Optional[SessionColumns]):
+        self._columns = columns
+        self._column_changes = []
+    
+    def _queue_column_change(self, op: str, value):
+        if self._columns is not None:
+            self._column_changes.append((op, value))
+    
+    def _current_columns(self) -> SessionColumns:
+        """The columnar copy with queued changes folded in; call under the write lock"""
+        if self._columns is None:
+            self._set_columns(self._build_columns())
+        elif self._column_changes:
+            columns = self._columns
+            for op, run in groupby(self._column_changes, key=lambda change: change[0]):
+                if op == "add":
+                    # Only the new sessions are read
+                    columns = columns.concat(self._columns_for([session for _, session in run]))
+                else:
+                    rows = np.arange(columns.n_sessions)
+                    for _, position in run:
+                        rows = np.delete(rows, position)
+                    columns = columns.take(rows)
+            self._set_columns(columns)
+        return self._columns
+    
+    def columns(self) -> SessionColumns:
+        """Columnar view of the current data, reloading if the file changed"""
+        self._load()
+        if self._data is None:
+            return SessionColumns()
+        with self._write_lock:
+            return self._current_columns()
+    
+    def data_version(self) -> str:
+        """Identifies the data being served: snapshot signature plus journal position"""
+        sig = self._snapshot_sig
+        if sig is None:
+            return ""
+        return f"{sig.mtime_ns}-{sig.size}-{sig.inode}:{self._journal_seq}"
+    
+    @property
+    def version(self) -> int:
+        """In-process counter bumped on every reload or applied mutation"""
+        self._load()
+        return self._version
+    
+    def validators(self) -> Tuple[str, float]:
+        """``(etag, last_modified)`` for the data currently served.
+
+        The tag comes from the snapshot signature and journal seq rather than
+        the in-process counter, so every worker hands out the same ETag for
+        the same data.
+        """
+        self._load()
+        version = self.data_version()
+        if not version:
+            return "", 0.0
+        return hashlib.sha1(version.encode()).hexdigest()[:20], self._modified_time
+    
+    def aggregates_age(self) -> float:
+        """Seconds since the served aggregates were computed or last updated"""
+        self._load()
+        return max(0.0, time.time() - self._aggregates_time)
+    
+    def save_aggregate_cache(self) -> bool:
+        """Persist the current aggregates for the current data version"""
+        try:
+            with self._write_lock:
+                self._load()
+                if self._aggregates is None:
+                    return False
+                self.aggregate_cache.save(self._aggregates, self.data_version(), self._aggregates_time)
+            return True
+        except Exception as e:
+            print(f"Error saving aggregate cache: {e}")
+            return False
+    
+    def aggregates(self) -> RunningAggregates:
+        """Running totals for the dashboard endpoints"""
+        self._load()
+        if self._aggregates is None:
+            return RunningAggregates(self._ensure_numeric)
+        return self._aggregates
+    
+    # Query interface shared with SQLiteDataService
+
+    def summary(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        if start_date is None and end_date is None:
+            return self.aggregates().summary()
+        return summary_response(self.range_totals(start_date, end_date))
+
+    def range_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Totals for sessions dated within the inclusive range, via daily prefix sums"""
+        start_day, end_day = day_range(start_date, end_date)
+        return self.aggregates().range_totals(start_day, end_day)
+
+    def restaurants_summary(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.aggregates().restaurants_summary(limit)
+
+    def locations(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.aggregates().locations(limit)
+
+    def weekly(self) -> List[Dict[str, Any]]:
+        return self.aggregates().weekly()
+    
+    def rollup(self, granularity: str) -> List[Dict[str, Any]]:
+        return self.aggregates().rollup(granularity)
+
+    def heatmap(self) -> Dict[str, Any]:
+        return self.aggregates().heatmap_summary()
+
+    def timeseries(self) -> Dict[str, List]:
+        return self.columns().timeseries()
+
+    def session_index(self) -> SessionIndex:
+        """Date/restaurant/merchant-type index over the current sessions"""
+        self._load()
+        if self._index is None:
+            if self._shared is not None:
+                self._index = self._shared.index()
+            else:
+                self._index = SessionIndex.build(self._data["sessions"] if self._data else [])
+        return self._index
+    
+    def query_sessions(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       merchant: Optional[str] = None, merchant_type: Optional[str] = None,
+                       limit: int = 1000, offset: int = 0) -> Tuple[SessionPage, int]:
+        """Filtered page of sessions in file order plus the total number of matches"""
+        with self._write_lock:
+            return self.session_index().query(start_date, end_date, merchant, merchant_type, limit, offset)
+    
+    def query_sessions_after(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                             merchant: Optional[str] = None, merchant_type: Optional[str] = None,
+                             after: Optional[SessionKey] = None,
+                             limit: int = 1000) -> Tuple[SessionPage, int, Optional[SessionKey]]:
+        """Keyset page in (date, id) order; returns the page, total and next key"""
+        with self._write_lock:
+            return self.session_index().query_after(start_date, end_date, merchant, merchant_type, after, limit)
+    
     def _process_data(self):
         """Add derived fields to each session and normalize data types"""
         try:
             for session in self._data.get('sessions', []):
-                # Skip sessions without deliveries
-                if "deliveries" not in session:
-                    continue
-                    
-                # Ensure numeric fields are properly typed
-                if "active_time_minutes" in session:
-                    session["active_time_minutes"] = self._ensure_numeric(session["active_time_minutes"])
-                if "dash_time_minutes" in session:
-                    session["dash_time_minutes"] = self._ensure_numeric(session["dash_time_minutes"])
-                if "deliveries_count" in session:
-                    session["deliveries_count"] = self._ensure_numeric(session["deliveries_count"])
-                                       
-                # Process each delivery to ensure consistent types
-                for delivery in session.get("deliveries", []):
-                    if "total" in delivery:
-                        delivery["total"] = self._ensure_numeric(delivery["total"])
-                    if "doordash_pay" in delivery:
-                        delivery["doordash_pay"] = self._ensure_numeric(delivery["doordash_pay"])
-                    if "tip" in delivery:
-                        delivery["tip"] = self._ensure_numeric(delivery["tip"])
-                    
-                    # Add merchant_type if not present
-                    if "merchant_type" not in delivery and "restaurant" in delivery:
-                        delivery["merchant_type"] = self._get_merchant_type(delivery["restaurant"])
-                
-                # Calculate session earnings if not already present
-                if "earnings" not in session:
-                    # Use the normalized values for calculation
-                    session["earnings"] = sum(
-                        delivery.get("total", 0) 
-                        for delivery in session.get("deliveries", [])
-                    )
+                self._process_session(session)
         except Exception as e:
             print(f"Error processing data: {e}")
     
-    def _ensure_numeric(self, value):
-        """Convert various data types to a numeric (float) value"""
-        if isinstance(value, (int, float)):
-            return float(value)
-        elif isinstance(value, str):
-            # Remove any currency symbols or commas
-            clean_value = value.replace('$', '').replace(',', '').strip()
-            try:
-                return float(clean_value)
-            except ValueError:
-                print(f"Warning: Could not convert '{value}' to a number, using 0")
-                return 0.0
-        else:
-            # For None or other types
-            return 0.0
-    
-    def _get_merchant_type(self, merchant_name: str) -> str:
-        """Determine merchant type from name"""
-        if not merchant_name:
-            return "Restaurant"
-            
-        merchant_name_lower = merchant_name.lower()
-        
-        # Shopping/Pharmacy
-        if any(s in merchant_name_lower for s in ["cvs", "walgreens", "walmart", "target", "dollar general", "7-eleven"]):
-            return "Shopping"
+    def _process_session(self, session: Dict[str, Any]):
+        """Normalize one session in place and fill in derived fields"""
+        # Skip sessions without deliveries
+        if "deliveries" not in session:
+            return
             
-        # Grocery
-        if any(s in merchant_name_lower for s in ["kroger", "publix", "safeway", "albertsons", "aldi", "whole foods"]):
-            return "Grocery"
+        # Ensure numeric fields are properly typed
+        if "active_time_minutes" in session:
+            session["active_time_minutes"] = self._ensure_numeric(session["active_time_minutes"])
+        if "dash_time_minutes" in session:
+            session["dash_time_minutes"] = self._ensure_numeric(session["dash_time_minutes"])
+        if "deliveries_count" in session:
+            session["deliveries_count"] = self._ensure_numeric(session["deliveries_count"])
+                               
+        # Process each delivery to ensure consistent types
+        for delivery in session.get("deliveries", []):
+            if "total" in delivery:
+                delivery["total"] = self._ensure_numeric(delivery["total"])
+            if "doordash_pay" in delivery:
+                delivery["doordash_pay"] = self._ensure_numeric(delivery["doordash_pay"])
+            if "tip" in delivery:
+                delivery["tip"] = self._ensure_numeric(delivery["tip"])
             
-        # Fast food
-        if any(s in merchant_name_lower for s in ["mcdonald", "burger king", "wendy", "taco bell", "kfc", "chipotle"]):
-            return "Fast Food"
-            
-        # Default
-        return "Restaurant"
+            # Add merchant_type if not present
+            if "merchant_type" not in delivery and "restaurant" in delivery:
+                delivery["merchant_type"] = self._get_merchant_type(delivery["restaurant"])
+        
+        # Calculate session earnings if not already present
+        if "earnings" not in session:
+            # Use the normalized values for calculation
+            session["earnings"] = sum(
+                delivery.get("total", 0) 
+                for delivery in session.get("deliveries", [])
+            )
+    
+    # Convert various data types to a numeric (float) value
+    _ensure_numeric = staticmethod(to_number)
+    
+    def _get_merchant_type(self, merchant_name: str) -> str:
+        """Determine merchant type from name (rules in config/merchant_types.json)"""
+        return classify_merchant(merchant_name)
 
-    def add_session(self, session_data: Dict[str, Any]) -> bool:
-        """Add a new session to the data"""
+    def _submit(self, ops: List[Dict[str, Any]]) -> bool:
+        """Queue mutations for the writer thread and wait until they're committed.
+
+        The ops are committed together or not at all.
+        """
+        future = Future()
+        self._pending.put((ops, future))
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+                self._writer.start()
+        return future.result()
+
+    def _write_loop(self):
+        """Commit queued mutations, taking everything that piled up as one batch"""
+        while True:
+            batch = [self._pending.get()]
+            size = len(batch[0][0])
+            while size < WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+                size += len(batch[-1][0])
+            self._commit(batch)
+            self._maybe_compact()
+
+    def _commit(self, batch: List[Tuple[List[Dict[str, Any]], Future]]):
+        """Journal a batch of mutations with one fsynced write and apply them.
+
+        Each op is checked against the sessions as left by the ops before it,
+        so deleting a session twice in one batch only succeeds once.
+        """
+        results = [False] * len(batch)
+        written = False
         try:
-            # Force reload data to ensure we have latest
-            self._data = None
-            data = self.load_data()
-            
-            # Add the new session
-            data["sessions"].append(session_data)
-            
-            # Save the updated data back to the file
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Hold off other processes' writers and compaction for the whole batch
+            with self._write_lock, self.journal.locked():
+                # Pick up changes made by other processes first
+                self._load(verify=True)
+                if self._data is None:
+                    raise RuntimeError("sessions could not be loaded")
                 
-            # Force reload on next access
+                records = []
+                deleted = set()
+                next_id = self._next_session_id
+                for i, (ops, _) in enumerate(batch):
+                    removing = set()
+                    for op in ops:
+                        if op["op"] == "delete":
+                            session_id = op["id"]
+                            if session_id in deleted or session_id in removing or self._position_of(session_id) is None:
+                                break
+                            removing.add(session_id)
+                    else:
+                        deleted |= removing
+                        for op in ops:
+                            if op["op"] == "add":
+                                # Journaled with the session, so every worker gives it the same id
+                                op["session"]["id"] = next_id
+                                next_id += 1
+                            records.append({"seq": self._journal_seq + len(records) + 1, **op})
+                        results[i] = True
+                if records:
+                    # Append to the journal instead of rewriting the whole file
+                    start, end = self.journal.append_many(records)
+                    written = True
+                    self._journal_records += len(records)
+                    if start.offset != self._journal_pos.offset:
+                        # The journal moved under us; rebuild from disk to stay in order
+                        self._data = None
+                        self._load()
+                    else:
+                        self._journal_pos = end
+                        self._journal_seq = records[-1]["seq"]
+                        self._apply_records(records)
+                        self._mark_changed(time.time())
+        except Exception as e:
+            print(f"Error committing {len(batch)} writes: {e}")
+            # Fall back to a full reload on next access
             self._data = None
-            
-            return True
+            if not written:
+                results = [False] * len(batch)
+        for (_, future), ok in zip(batch, results):
+            future.set_result(ok)
+
+    def add_session(self, session_data: Dict[str, Any]) -> bool:
+        """Add a new session to the data"""
+        try:
+            self._process_session(session_data)
+            return self._submit([{"op": "add", "session": session_data}])
         except Exception as e:
             print(f"Error adding session: {e}")
             return False
 
-    def delete_session(self, session_index: int) -> bool:
-        """Delete a session by its index"""
+    def add_sessions(self, sessions: List[Dict[str, Any]]) -> bool:
+        """Add many sessions, committed together with one journal write"""
         try:
-            # Force reload data to ensure we have latest
-            self._data = None
-            data = self.load_data()
-            
-            if session_index < 0 or session_index >= len(data["sessions"]):
-                return False
-            
-            # Remove the session at the specified index
-            data["sessions"].pop(session_index)
-            
-            # Save the updated data back to the file
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                
-            # Force reload on next access
-            self._data = None
-            
-            return True
+            for session in sessions:
+                self._process_session(session)
+            return self._submit([{"op": "add", "session": session} for session in sessions])
+        except Exception as e:
+            print(f"Error adding sessions: {e}")
+            return False
+
+    def delete_session(self, session_id: int) -> bool:
+        """Delete the session with ``session_id``; False if there is none"""
+        try:
+            return self._submit([{"op": "delete", "id": session_id}])
         except Exception as e:
             print(f"Error deleting session: {e}")
             return False
 
+    def _maybe_compact(self):
+        """Start a background compaction once the journal passes a threshold"""
+        with self._write_lock:
+            if self._compacting:
+                return
+            if self._journal_records < self.journal_max_records and self._journal_pos.offset < self.journal_max_bytes:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def compact(self):
+        """Fold the journal into a new snapshot of the sessions file.
+
+        One process compacts at a time. The sessions are captured under the
+        journal lock and serialized without it; the new file only replaces
+        the old one if neither the sessions file nor the journal was
+        replaced meanwhile. The binary snapshot is only published here, and
+        the other workers switch to it when they see the new file.
+        """
+        try:
+            with self.journal.compaction_lock() as acquired:
+                # Otherwise another process is compacting
+                if acquired:
+                    self._compact()
+        except Exception as e:
+            print(f"Error compacting journal: {e}")
+        finally:
+            self._compacting = False
+    
+    def _compact(self):
+        """Write the new sessions file and binary snapshot, then truncate the journal"""
+        with self._write_lock, self.journal.locked():
+            self._load(verify=True)
+            if self._data is None:
+                return
+            sessions = self._shared.sessions() if self._shared is not None else list(self._data["sessions"])
+            columns = self._current_columns() if self.binary_snapshot else None
+            seq = self._journal_seq
+            snapshot = {**self._data, "sessions": sessions, "journal_seq": seq}
+            source = self._snapshot_sig
+            position = self._journal_pos
+            folded = self._journal_records
+        
+        # Serialize outside the locks so writes keep appending meanwhile
+        tmp_path = write_snapshot_tmp(self.data_file, snapshot)
+        encoded = SnapshotData.from_data(snapshot, columns) if columns is not None else None
+        
+        with self._write_lock, self.journal.locked():
+            journal = self.journal.position()
+            if (file_signature(self.data_file) != source or journal.inode != position.inode
+                    or journal.offset < position.offset):
+                # Replaced or rewritten by someone else; our offset would point into a different file
+                print("Warning: Sessions file or journal changed during compaction; skipping it")
+                os.remove(tmp_path)
+                return
+            # Apply what other processes appended meanwhile, so everything
+            # after ``position`` is reflected in memory when it's kept below
+            self._load(verify=True)
+            # Renaming keeps the signature, so key the binary snapshot to the
+            # new file before it replaces the old one
+            published = encoded is not None and self.binary_snapshot.save(encoded, seq, file_signature(tmp_path))
+            os.replace(tmp_path, self.data_file)
+            signature = file_signature(self.data_file)
+            # Keep only records appended after the snapshot was taken
+            tail = self.journal.truncate_before(position.offset)
+            if published:
+                # Serve from the new mapping like the other workers will; the
+                # running totals already include everything it holds
+                self._reload(signature)
+                self._generation_seen = self.generation.bump()
+            else:
+                self._snapshot_sig = signature
+                self._snapshot_seq = seq
+                self._journal_pos = tail._replace(offset=self._journal_pos.offset - position.offset)
+                self._journal_records -= folded
+        
+        # The snapshot signature changed, so re-key the materialized aggregates
+        self.save_aggregate_cache()
+
     def refresh_cache(self):
         """Force refresh of the data cache"""
         # Reset internal cache to force reload from file
         if hasattr(self, '_data'):
             self._data = None
-        if hasattr(self, '_last_load_time'):
-            self._last_load_time = 0
+        if hasattr(self, '_snapshot_sig'):
+            self._snapshot_sig = None
+        # Rebuild the running totals too rather than carry them over
+        self._aggregates = None
         
         # Load fresh data
-        return self.load_data()
\ No newline at end of file
+        return self.load_data()
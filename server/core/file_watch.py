@@ -0,0 +1,127 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event header: wd, mask, cookie, len (followed by the name)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileSignature(NamedTuple):
+    """Identity of a file version.
+
+    ``mtime_ns`` catches writes within the same second, ``size`` catches
+    writes within one timestamp tick and ``inode`` catches atomic
+    replacement via ``os.replace``.
+    """
+    mtime_ns: int
+    size: int
+    inode: int
+
+
+def file_signature(path: Path) -> Optional[FileSignature]:
+    """Current signature of ``path``, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return FileSignature(st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """Cheap "may these files have changed?" check.
+
+    On Linux a daemon thread follows inotify events for the watched files'
+    directories, so ``poll()`` is a flag check and callers only stat the
+    files after something actually touched them. Elsewhere, or if inotify
+    is unavailable, ``poll()`` always returns True and callers fall back to
+    comparing signatures on every call.
+    """
+
+    def __init__(self, paths: Iterable[Path], use_inotify: bool = True):
+        self.paths = [Path(p) for p in paths]
+        self._names = {os.fsencode(p.name) for p in self.paths}
+        self._dirty = threading.Event()
+        self._dirty.set()
+        self._fd = None
+        if use_inotify:
+            self._start_inotify()
+
+    @property
+    def active(self) -> bool:
+        """Whether change notifications are being delivered"""
+        return self._fd is not None
+
+    def poll(self) -> bool:
+        """True if the files may have changed since the previous poll"""
+        if self._fd is None:
+            return True
+        if not self._dirty.is_set():
+            return False
+        # Clear before the caller stats, so a write racing the check re-flags it
+        self._dirty.clear()
+        return True
+
+    def invalidate(self):
+        """Make the next poll() report a possible change"""
+        self._dirty.set()
+
+    def _start_inotify(self):
+        libc = _load_libc()
+        if libc is None:
+            return
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return
+        # Watch directories rather than files so atomic replacement is seen
+        for directory in {str(p.parent) for p in self.paths}:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+                os.close(fd)
+                return
+        self._fd = fd
+        threading.Thread(target=self._watch, daemon=True, name="data-file-watcher").start()
+
+    def _watch(self):
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                print(f"Warning: inotify watcher stopped ({e}), falling back to polling")
+                self._fd = None
+                self._dirty.set()
+                return
+            pos = 0
+            while pos + _EVENT_HEADER.size <= len(buf):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(buf, pos)
+                start = pos + _EVENT_HEADER.size
+                name = buf[start:start + length].rstrip(b"\0")
+                pos = start + length
+                if mask & IN_Q_OVERFLOW or name in self._names:
+                    self._dirty.set()
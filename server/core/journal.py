@@ -0,0 +1,183 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, NamedTuple, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from core import codec
+
+
+class JournalPosition(NamedTuple):
+    """A byte offset in one particular journal file.
+
+    Compaction replaces the journal with a new file holding only its tail,
+    so an offset is meaningless without the inode it was taken in.
+    """
+    inode: int
+    offset: int
+
+
+# Position before anything was read; never matches a real file
+JOURNAL_START = JournalPosition(0, 0)
+
+
+class SessionJournal:
+    """Append-only JSONL write-ahead log kept next to the sessions file.
+
+    Each line is one mutation, e.g. ``{"seq": 7, "op": "add", "session": {...}}``
+    or ``{"seq": 8, "op": "delete", "id": 3}``. Appends are fsynced before
+    returning, so a write is durable once ``append`` returns. A torn final
+    line left by a crash is ignored on replay. The snapshot records the last
+    ``seq`` folded into it, so records that survive a crash mid-compaction
+    are skipped instead of applied twice.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def size(self) -> int:
+        """Current journal size in bytes (0 if it doesn't exist)"""
+        return self.position().offset
+
+    def position(self) -> JournalPosition:
+        """Inode and size of the current journal file (``JOURNAL_START`` if it doesn't exist)"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return JOURNAL_START
+        return JournalPosition(st.st_ino, st.st_size)
+
+    @contextmanager
+    def locked(self):
+        """Hold the cross-process writer lock (``flock`` on a side file).
+
+        Writers append and compact under it, so a process never has to
+        discover another process's append after the fact.
+        """
+        with open(self.path.with_name(self.path.name + ".lock"), 'a+b') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    @contextmanager
+    def compaction_lock(self) -> Iterator[bool]:
+        """Try to become the only process compacting; yields whether it did.
+
+        Held for the whole compaction, so two processes never fold and
+        truncate the same journal at once. Never waits.
+        """
+        with open(self.path.with_name(self.path.name + ".compact.lock"), 'a+b') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            yield True
+
+    def append(self, record: Dict[str, Any]) -> Tuple[JournalPosition, JournalPosition]:
+        """Append one record and fsync it.
+
+        Returns the ``(start, end)`` positions of the new record.
+        """
+        return self.append_many([record])
+
+    def append_many(self, records: List[Dict[str, Any]]) -> Tuple[JournalPosition, JournalPosition]:
+        """Append several records with one write and one fsync.
+
+        Returns the ``(start, end)`` positions of the new records.
+        """
+        line = b''.join(codec.dumps(record) + b'\n' for record in records)
+        with self._lock:
+            with open(self.path, 'a+b') as f:
+                start = f.seek(0, os.SEEK_END)
+                if start:
+                    # Terminate a torn record so it can't swallow this one
+                    f.seek(start - 1)
+                    if f.read(1) != b'\n':
+                        line = b'\n' + line
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                inode = os.fstat(f.fileno()).st_ino
+                return JournalPosition(inode, start), JournalPosition(inode, start + len(line))
+
+    def read_from(self, position: JournalPosition) -> Tuple[List[Dict[str, Any]], JournalPosition]:
+        """Complete records after ``position`` and the position after them.
+
+        If the journal is no longer the file ``position`` was taken in (it
+        was compacted) or has shrunk, it is read from the start; records
+        carry their ``seq``, so the caller skips the ones it already has.
+        """
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return [], JOURNAL_START
+        with f:
+            st = os.fstat(f.fileno())
+            offset = position.offset
+            if st.st_ino != position.inode or st.st_size < offset:
+                offset = 0
+            records = []
+            for record, offset in self._records(f, offset):
+                records.append(record)
+            return records, JournalPosition(st.st_ino, offset)
+
+    @staticmethod
+    def _records(f, offset: int) -> Iterator[Tuple[Dict[str, Any], int]]:
+        f.seek(offset)
+        position = offset
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Torn write from a crash; stop at the last complete record
+                break
+            position += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield codec.loads(line), position
+            except ValueError:
+                print(f"Warning: Skipping corrupt journal record at byte {position - len(line)}")
+
+    def truncate_before(self, offset: int) -> JournalPosition:
+        """Drop records before ``offset`` (already folded into a snapshot).
+
+        Records appended after ``offset`` are kept in a new file. Returns
+        the new file's position at its end.
+        """
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+            except FileNotFoundError:
+                return JOURNAL_START
+
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            return self.position()
+
+
+def write_snapshot_tmp(path: Path, data: Dict[str, Any]) -> Path:
+    """Write ``data`` to a temp file next to ``path`` and fsync it.
+
+    The caller publishes it with ``os.replace(tmp_path, path)`` so readers
+    never see a partially written sessions file.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(codec.dumps(data, indent=True))
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
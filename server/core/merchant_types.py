@@ -0,0 +1,118 @@
+"""
+Merchant type classification.
+
+A delivery's merchant type comes from its restaurant name: the first rule in
+``config/merchant_types.json`` with a pattern occurring anywhere in the
+lowercased name wins, and names matching no rule get the default type.
+
+All patterns are compiled into one Aho-Corasick automaton, so a name is
+classified in a single pass over its characters however many chains the
+rules list. Results are memoized per distinct name, so classifying a whole
+file costs one pass per merchant rather than per delivery.
+"""
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import MERCHANT_TYPES_FILE, MERCHANT_TYPE_CACHE_SIZE
+from core import codec
+
+DEFAULT_MERCHANT_TYPE = "Restaurant"
+
+# Rank of "no rule matched"; real ranks are rule positions
+NO_MATCH = 1 << 30
+
+
+class _Automaton:
+    """Aho-Corasick automaton reporting the lowest rank among matched patterns"""
+
+    def __init__(self, patterns: Dict[str, int]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Lowest rank of any pattern ending at this state, through fail links too
+        self.rank: List[int] = [NO_MATCH]
+
+        for pattern, rank in patterns.items():
+            state = 0
+            for char in pattern:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.rank.append(NO_MATCH)
+                state = nxt
+            self.rank[state] = min(self.rank[state], rank)
+
+        # Breadth-first, so every fail target is finished before it's used
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.rank[child] = min(self.rank[child], self.rank[self.fail[child]])
+
+    def best_rank(self, text: str) -> int:
+        goto, fail, ranks = self.goto, self.fail, self.rank
+        state, best = 0, NO_MATCH
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if ranks[state] < best:
+                best = ranks[state]
+        return best
+
+
+class MerchantClassifier:
+    """Classifies restaurant names with ordered ``(merchant_type, patterns)`` rules"""
+
+    def __init__(self, rules: List[Tuple[str, List[str]]], default: str = DEFAULT_MERCHANT_TYPE,
+                 cache_size: int = MERCHANT_TYPE_CACHE_SIZE):
+        self.types = [merchant_type for merchant_type, _ in rules]
+        self.default = default
+        patterns: Dict[str, int] = {}
+        for rank, (_, names) in enumerate(rules):
+            for name in names:
+                # An earlier rule keeps a pattern listed twice
+                patterns.setdefault(name.lower(), rank)
+        self._automaton = _Automaton(patterns)
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    @classmethod
+    def from_file(cls, path: Path, cache_size: int = MERCHANT_TYPE_CACHE_SIZE) -> "MerchantClassifier":
+        config = codec.load_file(path)
+        rules = [(rule["merchant_type"], list(rule.get("patterns", []))) for rule in config.get("rules", [])]
+        return cls(rules, config.get("default", DEFAULT_MERCHANT_TYPE), cache_size)
+
+    def _classify(self, merchant_name: str) -> str:
+        if not merchant_name:
+            return self.default
+        rank = self._automaton.best_rank(merchant_name.lower())
+        return self.types[rank] if rank != NO_MATCH else self.default
+
+
+_classifier: Optional[MerchantClassifier] = None
+
+
+def get_classifier() -> MerchantClassifier:
+    """The process-wide classifier, loaded from ``MERCHANT_TYPES_FILE`` on first use"""
+    global _classifier
+    if _classifier is None:
+        try:
+            _classifier = MerchantClassifier.from_file(MERCHANT_TYPES_FILE)
+        except Exception as e:
+            print(f"Error loading merchant type rules from {MERCHANT_TYPES_FILE}: {e}")
+            _classifier = MerchantClassifier([])
+    return _classifier
+
+
+def classify_merchant(merchant_name: str) -> str:
+    """Merchant type for a restaurant name"""
+    return get_classifier().classify(merchant_name)
@@ -0,0 +1,199 @@
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class Record:
+    """Dict-like record stored in ``__slots__``.
+
+    Known fields live in slots and anything else in ``extra``. An unset slot
+    means the key is absent, so ``"challenge_bonus" in session`` keeps its
+    dict meaning and existing ``get``/``[]``/``in`` code works unchanged.
+    Records are converted back to dicts only when serialized (``to_dict``).
+    """
+
+    __slots__ = ("extra",)
+    FIELDS: Tuple[str, ...] = ()
+    FIELD_SET: frozenset = frozenset()
+
+    def __init__(self):
+        self.extra: Optional[Dict[str, Any]] = None
+
+    def __getitem__(self, key: str):
+        if key in self.FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is None:
+            raise KeyError(key)
+        return self.extra[key]
+
+    def __setitem__(self, key: str, value):
+        if key in self.FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self.FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra is None:
+            raise KeyError(key)
+        else:
+            del self.extra[key]
+
+    def __contains__(self, key) -> bool:
+        if key in self.FIELD_SET:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def get(self, key: str, default=None):
+        if key in self.FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra is None:
+            return default
+        return self.extra.get(key, default)
+
+    def setdefault(self, key: str, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def keys(self) -> Iterator[str]:
+        for name in self.FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    __iter__ = keys
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for name in self.keys():
+            yield name, self[name]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (dict, Record)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+_MISSING = object()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Delivery(Record):
+    """One delivery; restaurant and merchant-type names are interned"""
+
+    __slots__ = ("restaurant", "merchant_type", "doordash_pay", "tip", "total")
+    FIELDS = ("restaurant", "merchant_type", "doordash_pay", "tip", "total")
+    FIELD_SET = frozenset(FIELDS)
+
+    def __setitem__(self, key: str, value):
+        if key == "restaurant" or key == "merchant_type":
+            value = _intern(value)
+        super().__setitem__(key, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Delivery":
+        delivery = cls.__new__(cls)
+        delivery.extra = None
+        fields = cls.FIELD_SET
+        for key, value in data.items():
+            if key in fields:
+                setattr(delivery, key, value)
+            else:
+                Record.__setitem__(delivery, key, value)
+        # Thousands of deliveries share a handful of names
+        if type(data.get("restaurant")) is str:
+            delivery.restaurant = sys.intern(delivery.restaurant)
+        if type(data.get("merchant_type")) is str:
+            delivery.merchant_type = sys.intern(delivery.merchant_type)
+        return delivery
+
+
+# Session ids are positive ints that JSON clients can hold exactly
+MAX_SESSION_ID = 2 ** 53
+
+
+def is_session_id(value) -> bool:
+    return type(value) is int and 0 < value < MAX_SESSION_ID
+
+
+class Session(Record):
+    """One dash session with its deliveries as ``Delivery`` records"""
+
+    __slots__ = ("id", "date", "start_time", "end_time", "active_time_minutes", "dash_time_minutes",
+                 "deliveries_count", "earnings", "challenge_bonus", "deliveries")
+    FIELDS = ("id", "date", "start_time", "end_time", "active_time_minutes", "dash_time_minutes",
+              "deliveries_count", "earnings", "challenge_bonus", "deliveries")
+    FIELD_SET = frozenset(FIELDS)
+
+    def __setitem__(self, key: str, value):
+        if key == "deliveries" and type(value) is list:
+            value = [Delivery.from_dict(d) if type(d) is dict else d for d in value]
+        elif key == "date":
+            # Many sessions share a date
+            value = _intern(value)
+        super().__setitem__(key, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Session":
+        session = cls.__new__(cls)
+        session.extra = None
+        fields = cls.FIELD_SET
+        for key, value in data.items():
+            if key in fields:
+                setattr(session, key, value)
+            else:
+                Record.__setitem__(session, key, value)
+        if type(data.get("deliveries")) is list:
+            session.deliveries = [Delivery.from_dict(d) if type(d) is dict else d for d in data["deliveries"]]
+        if type(data.get("date")) is str:
+            session.date = sys.intern(session.date)
+        return session
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        deliveries = data.get("deliveries")
+        if type(deliveries) is list:
+            data["deliveries"] = [d.to_dict() if isinstance(d, Record) else d for d in deliveries]
+        return data
+
+
+# Anything the service treats as a session or delivery
+RECORD_TYPES = (dict, Record)
+
+
+def to_session(value):
+    """Session record for a decoded session dict (other values pass through)"""
+    return Session.from_dict(value) if type(value) is dict else value
+
+
+def to_plain(value):
+    """JSON-ready form of a record (dicts pass through)"""
+    return value.to_dict() if isinstance(value, Record) else value
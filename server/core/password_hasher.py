@@ -0,0 +1,113 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import bcrypt
+
+from config.settings import BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_QUEUE_DEPTH
+
+# Recent operations kept for the latency percentiles
+LATENCY_SAMPLES = 1000
+
+
+class AuthBusy(Exception):
+    """Every hashing slot is taken; retry after ``retry_after`` seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Too many authentication requests, try again shortly")
+        self.retry_after = retry_after
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    if not samples:
+        return {"mean": 0, "p50": 0, "p95": 0, "max": 0}
+    ordered = sorted(samples)
+    return {
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+class PasswordHasher:
+    """bcrypt on a small dedicated thread pool with a bounded queue.
+
+    At most ``workers`` hashes run at once (bcrypt releases the GIL, so
+    request threads serving reads keep running) and at most
+    ``queue_depth`` more wait. Anything beyond that raises ``AuthBusy``
+    immediately instead of tying up another request thread.
+    """
+
+    def __init__(self, workers: int = BCRYPT_WORKERS, queue_depth: int = BCRYPT_QUEUE_DEPTH,
+                 rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        # Seconds spent hashing, and waiting for a worker, per operation
+        self._latency = deque(maxlen=LATENCY_SAMPLES)
+        self._wait = deque(maxlen=LATENCY_SAMPLES)
+
+    def hash(self, password: str) -> str:
+        """bcrypt hash of ``password`` at the configured cost"""
+        hashed = self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def check(self, password: str, hashed: str) -> bool:
+        """Whether ``password`` matches the stored ``hashed`` value"""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def _run(self, fn: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise AuthBusy(self.retry_after())
+        with self._lock:
+            self._in_flight += 1
+        queued = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait.append(started - queued)
+                    self._latency.append(finished - started)
+
+        try:
+            return self._executor.submit(timed).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        with self._lock:
+            mean = sum(self._latency) / len(self._latency) if self._latency else 0.25
+            return max(1, math.ceil(mean * self._in_flight / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "rounds": self.rounds,
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "hash_ms": _percentiles(self._latency),
+                "wait_ms": _percentiles(self._wait),
+            }
@@ -0,0 +1,115 @@
+import threading
+from pathlib import Path
+from typing import Optional
+
+from flask import current_app, has_app_context
+
+from config.settings import DATA_FILE, USERS_FILE, SQLITE_FILE, STORAGE_BACKEND, RESPONSE_CACHE_MAX_BYTES
+from core.data_service import DoorDashDataService
+from core.auth import AuthService
+from core.response_cache import ResponseCache
+
+EXTENSION_NAME = "doordash_services"
+
+
+class ServiceRegistry:
+    """Process-wide holder for the shared data and auth services.
+
+    Services are built on first use so importing a blueprint never touches
+    the data file, and every blueprint in the worker shares one parsed copy.
+    """
+
+    def __init__(self, data_file: Path = DATA_FILE, users_file: Path = USERS_FILE,
+                 backend: str = STORAGE_BACKEND, sqlite_file: Path = SQLITE_FILE):
+        self.data_file = data_file
+        self.users_file = users_file
+        self.backend = backend
+        self.sqlite_file = sqlite_file
+        self._data_service: Optional[DoorDashDataService] = None
+        self._auth_service: Optional[AuthService] = None
+        self.response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+        self._lock = threading.Lock()
+
+    def configure(self, data_file: Path = None, users_file: Path = None,
+                  backend: str = None, sqlite_file: Path = None):
+        """Point the registry at different files, dropping any built services"""
+        with self._lock:
+            for name, value in (("data_file", data_file), ("backend", backend), ("sqlite_file", sqlite_file)):
+                if value is not None and value != getattr(self, name):
+                    setattr(self, name, value)
+                    self._data_service = None
+                    # Versions from the old service mean nothing for the new one
+                    self.response_cache.clear()
+            if users_file is not None and users_file != self.users_file:
+                self.users_file = users_file
+                self._auth_service = None
+
+    @property
+    def has_aggregate_cache(self) -> bool:
+        """Whether the configured backend materializes aggregates to cache.json.
+
+        Only the JSON backend does; SQLite answers aggregates with queries.
+        """
+        return self.backend != "sqlite"
+
+    @property
+    def data_service(self) -> DoorDashDataService:
+        if self._data_service is None:
+            with self._lock:
+                if self._data_service is None:
+                    self._data_service = self._build_data_service()
+        return self._data_service
+
+    def _build_data_service(self):
+        if self.backend == "sqlite":
+            # Imported lazily so the JSON backend never touches sqlite3
+            from core.sqlite_service import SQLiteDataService
+            return SQLiteDataService(Path(self.sqlite_file))
+        if self.backend != "json":
+            print(f"Warning: Unknown STORAGE_BACKEND '{self.backend}', using json")
+        return DoorDashDataService(Path(self.data_file))
+
+    @property
+    def auth_service(self) -> AuthService:
+        if self._auth_service is None:
+            with self._lock:
+                if self._auth_service is None:
+                    self._auth_service = AuthService(self.users_file)
+        return self._auth_service
+
+
+# One registry per process; create_app() attaches it to the Flask app
+services = ServiceRegistry()
+
+
+def init_app(app):
+    """Attach the process-wide registry to a Flask app"""
+    services.configure(
+        data_file=app.config.get("DATA_FILE"),
+        users_file=app.config.get("USERS_FILE"),
+        backend=app.config.get("STORAGE_BACKEND"),
+        sqlite_file=app.config.get("SQLITE_FILE"),
+    )
+    app.extensions[EXTENSION_NAME] = services
+    return services
+
+
+def get_registry() -> ServiceRegistry:
+    if has_app_context():
+        return current_app.extensions.get(EXTENSION_NAME, services)
+    return services
+
+
+def get_data_service() -> DoorDashDataService:
+    """Shared DoorDashDataService for the current process"""
+    return get_registry().data_service
+
+
+def get_response_cache() -> ResponseCache:
+    """Shared response cache for the current process"""
+    return get_registry().response_cache
+
+
+def get_auth_service() -> AuthService:
+    """Shared AuthService for the current process"""
+    return get_registry().auth_service
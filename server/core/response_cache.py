@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional
+
+from flask import current_app, jsonify, request
+
+from utils.json_stream import iter_json_object
+
+
+class ResponseCache:
+    """Bounded LRU of serialized JSON bodies for GET endpoints.
+
+    Entries are keyed on route, normalized query string and the data
+    service's version. A lookup with a newer version drops every entry at
+    once, so a write invalidates the whole cache without the writer having
+    to know about it. Eviction is by total body size.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # One large export shouldn't flush everything else
+        self.max_entry_bytes = max_bytes // 8
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[bytes]:
+        with self._lock:
+            if version != self._version:
+                self._reset(version)
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Hashable, version: Hashable, body: bytes):
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                # Built from data that has since changed
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._reset(None)
+
+    def _reset(self, version: Hashable):
+        self._entries.clear()
+        self._size = 0
+        self._version = version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+# Query parameters clients add only to defeat HTTP caches (e.g. ``?_=<timestamp>``).
+# They never change the response, so they're left out of the key rather than
+# making every poll a single-use entry that evicts useful ones
+CACHE_BUSTER_PARAMS = frozenset({"_", "_t", "nocache", "cachebust"})
+
+
+def request_key() -> Hashable:
+    """Route plus query string with parameters in a canonical order"""
+    args = [(name, value) for name, value in request.args.items(multi=True) if name not in CACHE_BUSTER_PARAMS]
+    return request.path, tuple(sorted(args))
+
+
+def cached_json(cache: ResponseCache, version: Hashable, build: Callable[[], Any]):
+    """JSON response for the current GET, serialized at most once per data version"""
+    key = request_key()
+    body = cache.get(key, version)
+    if body is None:
+        body = jsonify(build()).get_data()
+        cache.put(key, version, body)
+    return current_app.response_class(body, mimetype=current_app.json.mimetype)
+
+
+def cached_json_stream(cache: ResponseCache, version: Hashable, build: Callable[[], Dict[str, Any]],
+                       stream_key: str):
+    """Like ``cached_json`` but a cache miss streams ``build()[stream_key]`` item by item.
+
+    ``build()`` runs before the first byte is sent, so it should return a
+    lazy page (see ``SessionPage``) for the items to be built as they're
+    serialized rather than all up front.
+    """
+    key = request_key()
+    body = cache.get(key, version)
+    if body is not None:
+        return current_app.response_class(body, mimetype=current_app.json.mimetype)
+    chunks = iter_json_object(build(), stream_key, current_app.json.dumps)
+    return current_app.response_class(_tee(chunks, cache, key, version), mimetype=current_app.json.mimetype)
+
+
+def _tee(chunks: Iterable[bytes], cache: ResponseCache, key: Hashable, version: Hashable) -> Iterator[bytes]:
+    """Pass chunks through, caching the body if it stays small enough"""
+    kept, size = [], 0
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            if size <= cache.max_entry_bytes:
+                kept.append(chunk)
+            else:
+                kept = None
+        yield chunk
+    if kept is not None:
+        cache.put(key, version, b"".join(kept))
@@ -0,0 +1,232 @@
+import heapq
+import math
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+from core.models import RECORD_TYPES, to_plain
+
+# (date, session id); the cursor position for keyset pagination
+SessionKey = Tuple[str, int]
+# SessionKey plus the session's row number in the index
+_Key = Tuple[str, int, int]
+
+
+def _key_date(session: Dict[str, Any]) -> str:
+    return session.get("date") or ""
+
+
+def _key(session: Dict[str, Any], row: int) -> _Key:
+    return _key_date(session), session["id"], row
+
+
+def _names(session: Dict[str, Any], field: str) -> set:
+    return {d.get(field) for d in session.get("deliveries") or [] if isinstance(d, RECORD_TYPES) and d.get(field)}
+
+
+class SessionPage(Sequence):
+    """A page of sessions that builds each plain dict only when it's read.
+
+    Sessions held in memory are captured when the page is made, so later
+    writes don't change it. Rows of the base are decoded on access, which
+    needs no lock because a mapped snapshot never changes. A streamed
+    response therefore decodes and serializes one session at a time.
+    """
+
+    def __init__(self, base: Sequence[Dict[str, Any]], items: List[Tuple[int, Optional[Dict[str, Any]]]]):
+        self._base = base
+        # (row, session) pairs; session is None for rows read from ``base``
+        self._items = items
+
+    def _plain(self, item: Tuple[int, Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        row, session = item
+        return to_plain(self._base[row] if session is None else session)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._plain(item) for item in self._items[i]]
+        return self._plain(self._items[i])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for item in self._items:
+            yield self._plain(item)
+
+
+class SessionIndex:
+    """Date-sorted index and posting lists over the loaded sessions.
+
+    Every session gets a row number when it is indexed. Row numbers
+    increase in file order and are never reused, so ascending row is file
+    order even after deletes. ``keys`` holds ``(date, id, row)`` for every
+    session in sorted order, where ``id`` is the session's persistent id, and
+    ``restaurants`` / ``merchant_types`` hold the same keys for the sessions
+    that include a delivery from that restaurant or merchant type. Date
+    ranges are found with bisect on any of these lists. Keyset pages are
+    ordered by ``(date, id)`` alone, so a cursor means the same thing in
+    every worker and after a reload.
+    """
+
+    def __init__(self):
+        # Row number of each session, parallel to the sessions list
+        self.rows: List[int] = []
+        # Sessions by row; rows missing here are positions in ``base``
+        self.sessions: Dict[int, Dict[str, Any]] = {}
+        self.base: Sequence[Dict[str, Any]] = ()
+        self.keys: List[_Key] = []
+        self.restaurants: Dict[str, List[_Key]] = {}
+        self.merchant_types: Dict[str, List[_Key]] = {}
+        self._next_row = 0
+
+    @classmethod
+    def build(cls, sessions: List[Dict[str, Any]]) -> "SessionIndex":
+        index = cls()
+        index.rows = list(range(len(sessions)))
+        index.sessions = dict(enumerate(sessions))
+        index._next_row = len(sessions)
+        index.keys = sorted(_key(s, i) for i, s in enumerate(sessions))
+        # Walking the sorted keys keeps every posting list sorted too
+        for key in index.keys:
+            session = index.sessions[key[2]]
+            for name in _names(session, "restaurant"):
+                index.restaurants.setdefault(name, []).append(key)
+            for name in _names(session, "merchant_type"):
+                index.merchant_types.setdefault(name, []).append(key)
+        return index
+
+    @classmethod
+    def from_names(cls, base: Sequence[Dict[str, Any]], positions: List[int], dates: List[str], ids: List[int],
+                   restaurants: List[Tuple[int, str]], merchant_types: List[Tuple[int, str]]) -> "SessionIndex":
+        """Build over the rows of ``base`` at ``positions`` from their dates,
+        ids and ``(position, name)`` pairs.
+
+        Each row number is the position in ``base``, which is only indexed
+        when a page is returned, so it can be a snapshot that decodes rows
+        on access. Pairs for rows not in ``positions`` are ignored, and
+        sessions added later get rows past the end of ``base``.
+        """
+        index = cls()
+        index.base = base
+        index.rows = list(positions)
+        index._next_row = len(base)
+        index.keys = sorted(zip(dates, ids, index.rows))
+        keys = {key[2]: key for key in index.keys}
+        for postings, pairs in ((index.restaurants, restaurants), (index.merchant_types, merchant_types)):
+            for position, name in pairs:
+                key = keys.get(position)
+                if key is not None:
+                    postings.setdefault(name, []).append(key)
+            for name_keys in postings.values():
+                name_keys.sort()
+        return index
+
+    def _session(self, row: int) -> Dict[str, Any]:
+        session = self.sessions.get(row)
+        return self.base[row] if session is None else session
+
+    def _page(self, rows: List[int]) -> SessionPage:
+        return SessionPage(self.base, [(row, self.sessions.get(row)) for row in rows])
+
+    def add(self, session: Dict[str, Any]):
+        """Index a session appended to the end of the sessions list"""
+        row = self._next_row
+        self._next_row += 1
+        self.rows.append(row)
+        self.sessions[row] = session
+        key = _key(session, row)
+        insort(self.keys, key)
+        for name in _names(session, "restaurant"):
+            insort(self.restaurants.setdefault(name, []), key)
+        for name in _names(session, "merchant_type"):
+            insort(self.merchant_types.setdefault(name, []), key)
+
+    def remove(self, position: int):
+        """Drop the session at ``position`` in the sessions list"""
+        row = self.rows.pop(position)
+        session = self.sessions.pop(row, None)
+        if session is None:
+            session = self.base[row]
+        key = _key(session, row)
+        self._discard(self.keys, key)
+        for name in _names(session, "restaurant"):
+            self._discard(self.restaurants[name], key)
+        for name in _names(session, "merchant_type"):
+            self._discard(self.merchant_types[name], key)
+
+    @staticmethod
+    def _discard(keys: List[_Key], key: _Key):
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def _matches(self, start_date: Optional[str], end_date: Optional[str],
+                 merchant: Optional[str], merchant_type: Optional[str]) -> Tuple[List[_Key], int, int, Any]:
+        """Smallest sorted key list covering the filters, its date range and any leftover test"""
+        source, check = self.keys, None
+        if merchant is not None:
+            source = self.restaurants.get(merchant, [])
+        if merchant_type is not None:
+            by_type = self.merchant_types.get(merchant_type, [])
+            if merchant is None:
+                source = by_type
+            elif len(by_type) < len(source):
+                source, check = by_type, ("restaurant", merchant)
+            else:
+                check = ("merchant_type", merchant_type)
+        lo = bisect_left(source, (start_date,)) if start_date else 0
+        hi = bisect_right(source, (end_date, math.inf)) if end_date else len(source)
+        return source, lo, max(lo, hi), check
+
+    def _passes(self, key: _Key, check) -> bool:
+        field, name = check
+        return name in _names(self._session(key[2]), field)
+
+    def query(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              merchant: Optional[str] = None, merchant_type: Optional[str] = None,
+              limit: int = 1000, offset: int = 0) -> Tuple[SessionPage, int]:
+        """Filtered page in file order plus the total number of matches"""
+        limit, offset = max(0, limit), max(0, offset)
+        source, lo, hi, check = self._matches(start_date, end_date, merchant, merchant_type)
+        if check is None and source is self.keys and lo == 0 and hi == len(source):
+            # No filters: file order is position order
+            page = self.rows[offset:offset + limit]
+            return self._page(page), len(self.rows)
+        if check is None:
+            rows = [key[2] for key in source[lo:hi]]
+        else:
+            rows = [key[2] for key in source[lo:hi] if self._passes(key, check)]
+        # Only the rows up to the end of the page need to be in order
+        first = heapq.nsmallest(offset + limit, rows)
+        return self._page(first[offset:]), len(rows)
+
+    def query_after(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    merchant: Optional[str] = None, merchant_type: Optional[str] = None,
+                    after: Optional[SessionKey] = None,
+                    limit: int = 1000) -> Tuple[SessionPage, int, Optional[SessionKey]]:
+        """Keyset page in (date, id) order after ``after``.
+
+        Returns the page, the total number of matches and the key to resume
+        from, or None on the last page.
+        """
+        limit = max(0, limit)
+        source, lo, hi, check = self._matches(start_date, end_date, merchant, merchant_type)
+        start = max(lo, bisect_right(source, (*after, math.inf))) if after else lo
+        if check is None:
+            total = hi - lo
+            keys = source[start:min(hi, start + limit)]
+            more = start + limit < hi
+        else:
+            total, keys, more = 0, [], False
+            for i in range(lo, hi):
+                key = source[i]
+                if not self._passes(key, check):
+                    continue
+                total += 1
+                if i >= start:
+                    if len(keys) < limit:
+                        keys.append(key)
+                    else:
+                        more = True
+        next_key = keys[-1][:2] if more and keys else None
+        return self._page([key[2] for key in keys]), total, next_key
@@ -0,0 +1,486 @@
+"""
+Binary snapshot of the sessions file, shared by every worker.
+
+The snapshot holds the ``SessionColumns`` of the sessions as fixed-width
+arrays, plus the few extra columns needed to rebuild every session exactly:
+string ids for date/start/end, presence and int-ness bits, and a string
+table. It is loaded with ``mmap``, so the columns are numpy views of the
+file, shared through the page cache by all processes that map it. Sessions
+are decoded row by row when something needs them.
+
+Layout::
+
+    b"DDSNAP01" | header length (u64) | JSON header | 8-byte aligned arrays
+
+The header records the signature of the JSON file the snapshot was built
+from and the last journal seq it includes; a snapshot whose signature
+doesn't match is stale and ignored. Sessions the fixed-width layout can't
+represent (unknown keys, non-numeric amounts, ...) are kept as JSON in the
+header.
+
+Writes only go to the journal. Each worker applies the journal tail to a
+``SnapshotView`` of the mapped base, which holds deleted rows and added
+sessions privately instead of copying the arrays. Compaction writes a new
+snapshot and bumps a shared ``SnapshotGeneration`` counter.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from core import codec
+from core.columnar import SessionColumns
+from core.file_watch import FileSignature
+from core.models import RECORD_TYPES, Delivery, Record, Session, is_session_id, to_session
+from core.session_index import SessionIndex
+
+MAGIC = b"DDSNAP01"
+# Bump when the layout changes
+SNAPSHOT_FORMAT = 4
+
+# Session numeric fields and the column holding each
+SESSION_NUMBERS = (
+    ("active_time_minutes", "active_minutes"),
+    ("dash_time_minutes", "dash_minutes"),
+    ("deliveries_count", "deliveries_count"),
+    ("earnings", "earnings"),
+    ("challenge_bonus", "bonus"),
+)
+# Session text fields and the string-id column holding each
+SESSION_TEXT = (("date", "date_id"), ("start_time", "start_time_id"), ("end_time", "end_time_id"))
+# Session flags: bit i = number i present, bit 5 + i = number i is an int
+HAS_DELIVERIES = 1 << 10
+
+# Delivery numeric fields and the column holding each
+DELIVERY_NUMBERS = (("doordash_pay", "pay"), ("tip", "tip"), ("total", "total"))
+# Delivery flags: restaurant, merchant type, then presence and int bits as above
+HAS_RESTAURANT = 1
+HAS_MERCHANT_TYPE = 2
+
+# Arrays that are SessionColumns attributes
+COLUMN_ARRAYS = ("session_id", "day", "start_minute", "end_minute", "dash_minutes", "active_minutes",
+                 "bonus", "earnings", "deliveries_count", "has_date", "has_bonus", "has_deliveries", "has_times",
+                 "offsets", "pay", "tip", "total", "restaurant_id", "merchant_type_id", "delivery_session")
+
+_MISSING = object()
+
+
+def _is_number(value) -> bool:
+    kind = type(value)
+    return kind is float or (kind is int and abs(value) < 2 ** 53)
+
+
+def _number_flags(record: Record, fields) -> Optional[int]:
+    """Presence/int bits for ``fields``, or None if one isn't a plain number"""
+    flags = 0
+    for bit, (name, _) in enumerate(fields):
+        value = getattr(record, name, _MISSING)
+        if value is _MISSING:
+            continue
+        if not _is_number(value):
+            return None
+        flags |= 1 << bit
+        if type(value) is int:
+            flags |= 1 << (len(fields) + bit)
+    return flags
+
+
+def _session_flags(session: Record, delivery_flags: List[Optional[int]]) -> Optional[int]:
+    """Flags for a session the fixed-width layout can hold exactly, else None"""
+    if type(session) is not Session or session.extra:
+        return None
+    # The id column holds valid ids only
+    session_id = getattr(session, "id", _MISSING)
+    if session_id is not _MISSING and not is_session_id(session_id):
+        return None
+    for name, _ in SESSION_TEXT:
+        value = getattr(session, name, _MISSING)
+        if value is not _MISSING and type(value) is not str:
+            return None
+    flags = _number_flags(session, SESSION_NUMBERS)
+    if flags is None:
+        return None
+    deliveries = getattr(session, "deliveries", _MISSING)
+    if deliveries is not _MISSING:
+        if type(deliveries) is not list or len(deliveries) != len(delivery_flags) or None in delivery_flags:
+            return None
+        flags |= HAS_DELIVERIES
+    return flags
+
+
+def _delivery_flags(delivery) -> Optional[int]:
+    if type(delivery) is not Delivery or delivery.extra:
+        return None
+    flags = 0
+    for bit, name in ((HAS_RESTAURANT, "restaurant"), (HAS_MERCHANT_TYPE, "merchant_type")):
+        value = getattr(delivery, name, _MISSING)
+        if value is not _MISSING:
+            if type(value) is not str:
+                return None
+            flags |= bit
+    numbers = _number_flags(delivery, DELIVERY_NUMBERS)
+    if numbers is None:
+        return None
+    return flags | numbers << 2
+
+
+class _Items:
+    """Indexes a numpy array as plain Python values"""
+
+    __slots__ = ("item",)
+
+    def __init__(self, array: np.ndarray):
+        self.item = array.item
+
+    def __getitem__(self, i: int):
+        return self.item(i)
+
+
+class SnapshotData:
+    """Sessions held as snapshot columns; a sequence of sessions decoded on access.
+
+    The arrays are either views of a mapped snapshot file or private arrays
+    from ``encode``.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], strings: List[str], restaurants: List[str],
+                 merchant_types: List[str], irregular: Dict[int, Session],
+                 meta: Dict[str, Any], journal_seq: int = 0):
+        self.arrays = arrays
+        self.strings = strings
+        self.restaurants = restaurants
+        self.merchant_types = merchant_types
+        # Sessions the fixed-width columns can't hold, by position
+        self.irregular = irregular
+        # Top-level keys of the sessions file other than "sessions"
+        self.meta = meta
+        self.journal_seq = journal_seq
+        self._items = None
+
+    @classmethod
+    def encode(cls, sessions: List[Record], columns: SessionColumns,
+               meta: Optional[Dict[str, Any]] = None) -> Optional["SnapshotData"]:
+        """Snapshot of normalized sessions and their columns, or None if they can't be represented"""
+        if not all(isinstance(s, Record) for s in sessions) or len(sessions) != columns.n_sessions:
+            return None
+        if not all(type(name) is str for name in columns.restaurants + columns.merchant_types):
+            return None
+
+        strings: Dict[str, int] = {}
+        text_ids = {column: [] for _, column in SESSION_TEXT}
+        session_flags, delivery_flags, irregular = [], [], {}
+        for i, session in enumerate(sessions):
+            for name, column in SESSION_TEXT:
+                value = session.get(name)
+                text_ids[column].append(strings.setdefault(value, len(strings)) if type(value) is str else -1)
+            # Same deliveries, in the same order, as the delivery columns
+            deliveries = [_delivery_flags(d) for d in session.get("deliveries") or []
+                          if isinstance(d, RECORD_TYPES)]
+            delivery_flags.extend(flags or 0 for flags in deliveries)
+            flags = _session_flags(session, deliveries)
+            if flags is None:
+                irregular[i] = session
+                flags = 0
+            session_flags.append(flags)
+        if len(delivery_flags) != columns.n_deliveries:
+            return None
+
+        arrays = {name: getattr(columns, name) for name in COLUMN_ARRAYS}
+        for column, ids in text_ids.items():
+            arrays[column] = np.asarray(ids, dtype=np.int32)
+        arrays["session_flags"] = np.asarray(session_flags, dtype=np.uint16)
+        arrays["delivery_flags"] = np.asarray(delivery_flags, dtype=np.uint8)
+        return cls(arrays, list(strings), list(columns.restaurants), list(columns.merchant_types),
+                   irregular, dict(meta or {}))
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any], columns: SessionColumns) -> Optional["SnapshotData"]:
+        """Snapshot of a sessions file's contents (already normalized) and its columns"""
+        meta = {k: v for k, v in data.items() if k not in ("sessions", "journal_seq")}
+        return cls.encode(data.get("sessions", []), columns, meta)
+
+    def __len__(self) -> int:
+        return len(self.arrays["session_flags"])
+
+    @property
+    def n_deliveries(self) -> int:
+        return len(self.arrays["delivery_flags"])
+
+    def labels(self) -> List[str]:
+        """Each session's date, or "" if it has none"""
+        strings = self.strings
+        return [strings[i] if i >= 0 else "" for i in self.arrays["date_id"].tolist()]
+
+    def columns(self) -> SessionColumns:
+        cols = SessionColumns()
+        for name in COLUMN_ARRAYS:
+            setattr(cols, name, self.arrays[name])
+        cols.labels = self.labels()
+        cols.restaurants = self.restaurants
+        cols.merchant_types = self.merchant_types
+        return cols
+
+    def __getitem__(self, i: int) -> Session:
+        if self._items is None:
+            self._items = {name: _Items(array) for name, array in self.arrays.items()}
+        return self._session(i, self._items)
+
+    def sessions(self) -> List[Session]:
+        """Decode every session"""
+        values = {name: array.tolist() for name, array in self.arrays.items()}
+        return [self._session(i, values) for i in range(len(self))]
+
+    def _session(self, i: int, values) -> Session:
+        """Session ``i``, reading plain values from ``values[array name][index]``"""
+        if i in self.irregular:
+            return self.irregular[i]
+        session = Session()
+        session_id = values["session_id"][i]
+        if session_id >= 0:
+            session.id = session_id
+        strings = self.strings
+        for name, column in SESSION_TEXT:
+            string_id = values[column][i]
+            if string_id >= 0:
+                setattr(session, name, strings[string_id])
+        bits = values["session_flags"][i]
+        for bit, (name, column) in enumerate(SESSION_NUMBERS):
+            if bits >> bit & 1:
+                value = values[column][i]
+                setattr(session, name, int(value) if bits >> (5 + bit) & 1 else value)
+        if bits & HAS_DELIVERIES:
+            offsets = values["offsets"]
+            session.deliveries = [self._delivery(j, values) for j in range(offsets[i], offsets[i + 1])]
+        return session
+
+    def _delivery(self, j: int, values) -> Delivery:
+        delivery = Delivery()
+        bits = values["delivery_flags"][j]
+        if bits & HAS_RESTAURANT:
+            delivery.restaurant = self.restaurants[values["restaurant_id"][j]]
+        if bits & HAS_MERCHANT_TYPE:
+            delivery.merchant_type = self.merchant_types[values["merchant_type_id"][j]]
+        n = len(DELIVERY_NUMBERS)
+        for bit, (name, column) in enumerate(DELIVERY_NUMBERS):
+            if bits >> (2 + bit) & 1:
+                value = values[column][j]
+                setattr(delivery, name, int(value) if bits >> (2 + n + bit) & 1 else value)
+        return delivery
+
+    def names(self, field: str) -> List[Tuple[int, str]]:
+        """Distinct ``(session, name)`` pairs of non-empty restaurant or merchant type names"""
+        if field == "restaurant":
+            ids, table, bit = self.arrays["restaurant_id"], self.restaurants, HAS_RESTAURANT
+        else:
+            ids, table, bit = self.arrays["merchant_type_id"], self.merchant_types, HAS_MERCHANT_TYPE
+        present = (self.arrays["delivery_flags"] & bit) != 0
+        empty = [i for i, name in enumerate(table) if not name]
+        if empty:
+            present &= ~np.isin(ids, empty)
+        pairs = np.unique(self.arrays["delivery_session"][present].astype(np.int64) * len(table) + ids[present])
+        result = [(pair // len(table), table[pair % len(table)]) for pair in pairs.tolist()]
+        # Irregular sessions have no delivery flags
+        for i, session in self.irregular.items():
+            names = {d.get(field) for d in session.get("deliveries") or []
+                     if isinstance(d, RECORD_TYPES) and d.get(field)}
+            result.extend((i, name) for name in names)
+        return result
+
+
+class SnapshotView:
+    """A snapshot's sessions with the journal records applied since.
+
+    A sequence of sessions like the decoded list: rows of ``base`` that are
+    still live, in order, followed by the sessions added since, which are
+    held decoded. Neither an add nor a delete copies the base arrays.
+    """
+
+    def __init__(self, base: SnapshotData):
+        self.base = base
+        # Positions in ``base`` of the live rows; None until one is deleted
+        self.rows: Optional[np.ndarray] = None
+        self.added: List[Record] = []
+
+    def _n_base(self) -> int:
+        return len(self.base) if self.rows is None else len(self.rows)
+
+    def __len__(self) -> int:
+        return self._n_base() + len(self.added)
+
+    def __getitem__(self, i: int) -> Record:
+        n = self._n_base()
+        if i >= n:
+            return self.added[i - n]
+        return self.base[i if self.rows is None else int(self.rows[i])]
+
+    def append(self, session: Record):
+        self.added.append(session)
+
+    def pop(self, i: int) -> Record:
+        n = self._n_base()
+        if i >= n:
+            return self.added.pop(i - n)
+        session = self[i]
+        rows = np.arange(len(self.base)) if self.rows is None else self.rows
+        self.rows = np.delete(rows, i)
+        return session
+
+    def sessions(self) -> List[Record]:
+        """Decode every session"""
+        decoded = self.base.sessions()
+        if self.rows is not None:
+            decoded = [decoded[i] for i in self.rows.tolist()]
+        return decoded + self.added
+
+    def index(self) -> SessionIndex:
+        """Index over the sessions that decodes base rows only for the pages returned"""
+        base = self.base
+        positions = list(range(len(base))) if self.rows is None else self.rows.tolist()
+        labels, ids = base.labels(), base.arrays["session_id"].tolist()
+        index = SessionIndex.from_names(base, positions, [labels[i] for i in positions], [ids[i] for i in positions],
+                                        base.names("restaurant"), base.names("merchant_type"))
+        for session in self.added:
+            index.add(session)
+        return index
+
+
+class BinarySnapshot:
+    """Reads and writes the binary snapshot kept next to the sessions file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self, source: FileSignature) -> Optional[SnapshotData]:
+        """Map the snapshot if it was built from the JSON file with signature ``source``"""
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:len(MAGIC)] != MAGIC:
+                return None
+            (header_len,) = struct.unpack_from("<Q", mapped, len(MAGIC))
+            start = len(MAGIC) + 8
+            header = codec.loads(mapped[start:start + header_len])
+            if header.get("format") != SNAPSHOT_FORMAT or header.get("source") != list(source):
+                return None
+            base = start + header_len + (-header_len % 8)
+            arrays = {
+                name: np.frombuffer(mapped, dtype=dtype, count=count, offset=base + offset)
+                for name, (dtype, offset, count) in header["arrays"].items()
+            }
+            offsets, data = arrays.pop("string_offsets").tolist(), arrays.pop("string_data").tobytes()
+            strings = [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            irregular = {int(i): to_session(s) for i, s in header["irregular"].items()}
+            return SnapshotData(arrays, strings, header["restaurants"], header["merchant_types"],
+                                irregular, header["meta"], header["journal_seq"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable binary snapshot: {e}")
+            return None
+
+    def write(self, data: Dict[str, Any], journal_seq: int, source: FileSignature,
+              columns: SessionColumns) -> bool:
+        """Snapshot ``data`` (already normalized) and its columns.
+
+        Returns False without writing if the sessions can't be represented,
+        e.g. a restaurant name that isn't a string.
+        """
+        snapshot = SnapshotData.from_data(data, columns)
+        if snapshot is None:
+            return False
+        return self.save(snapshot, journal_seq, source)
+
+    def save(self, snapshot: SnapshotData, journal_seq: int, source: FileSignature) -> bool:
+        """Atomically write ``snapshot`` as including the journal up to ``journal_seq``"""
+        try:
+            encoded = [s.encode("utf-8") for s in snapshot.strings]
+            string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+            arrays = dict(snapshot.arrays)
+            arrays["string_offsets"] = string_offsets
+            arrays["string_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+            layout, offset = {}, 0
+            for name, array in arrays.items():
+                layout[name] = [array.dtype.str, offset, len(array)]
+                offset += array.nbytes + (-array.nbytes % 8)
+            header = codec.dumps({
+                "format": SNAPSHOT_FORMAT,
+                "source": list(source),
+                "journal_seq": journal_seq,
+                "meta": snapshot.meta,
+                "restaurants": snapshot.restaurants,
+                "merchant_types": snapshot.merchant_types,
+                "irregular": {str(i): s for i, s in snapshot.irregular.items()},
+                "arrays": layout,
+            })
+
+            # A unique name per writer, so concurrent saves never share a temp file
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(MAGIC + struct.pack("<Q", len(header)) + header + b"\0" * (-len(header) % 8))
+                    for array in arrays.values():
+                        f.write(np.ascontiguousarray(array).tobytes())
+                        f.write(b"\0" * (-array.nbytes % 8))
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            return True
+        except Exception as e:
+            print(f"Warning: Could not write binary snapshot: {e}")
+            return False
+
+
+class SnapshotGeneration:
+    """Counter in a small shared file, bumped whenever a snapshot is published.
+
+    Each process maps the file, so checking for a newer snapshot is a
+    memory read. Bumps are serialized with ``flock`` where available.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._map = None
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < 8:
+                    os.ftruncate(fd, 8)
+                self._map = mmap.mmap(fd, 8)
+            finally:
+                os.close(fd)
+        return self._map
+
+    def value(self) -> int:
+        """Current generation (0 if the counter file can't be used)"""
+        try:
+            return struct.unpack_from("<Q", self._mapped())[0]
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self) -> int:
+        """Increment the generation and return the new value"""
+        try:
+            mapped = self._mapped()
+            with open(self.path, "rb") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                value = struct.unpack_from("<Q", mapped)[0] + 1
+                struct.pack_into("<Q", mapped, 0, value)
+            return value
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not bump snapshot generation: {e}")
+            return 0
@@ -0,0 +1,479 @@
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+import numpy as np
+
+from core.aggregates import (summary_response, restaurants_response, locations_response, weekly_response,
+                             rollup_response, period_totals, day_range, HourlyHeatmap)
+from core.columnar import NO_DAY, _day_number, _minute_of_day
+from core.codec import to_number
+from core.models import RECORD_TYPES, is_session_id
+from core.data_service import DoorDashDataService
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    active_time_minutes REAL,
+    dash_time_minutes REAL,
+    deliveries_count REAL,
+    earnings REAL,
+    challenge_bonus REAL,
+    has_deliveries INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    restaurant TEXT,
+    merchant_type TEXT,
+    doordash_pay REAL,
+    tip REAL,
+    total REAL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions(date);
+CREATE INDEX IF NOT EXISTS idx_deliveries_session ON deliveries(session_id, position);
+CREATE INDEX IF NOT EXISTS idx_deliveries_restaurant ON deliveries(restaurant);
+CREATE INDEX IF NOT EXISTS idx_deliveries_merchant_type ON deliveries(merchant_type);
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    modified REAL NOT NULL
+);
+INSERT OR IGNORE INTO meta (id, version, modified) VALUES (1, 0, 0);
+"""
+
+# Columns stored natively; anything else in a session/delivery goes to `extra`
+SESSION_FIELDS = ["date", "start_time", "end_time", "active_time_minutes", "dash_time_minutes",
+                  "deliveries_count", "earnings", "challenge_bonus"]
+DELIVERY_FIELDS = ["restaurant", "merchant_type", "doordash_pay", "tip", "total"]
+
+
+class SQLiteDataService:
+    """SQLite storage backend with the same interface as DoorDashDataService.
+
+    Sessions and deliveries live in normalized tables, and the dashboard
+    queries run as SQL aggregates, so no worker has to hold the archive in
+    memory. The database runs in WAL mode, so readers in any gunicorn worker
+    never block the writer. Sessions keep their file order through their
+    ``id``, which is the same persistent id the JSON backend uses.
+    """
+
+    # Same normalization rules as the JSON backend
+    _process_session = DoorDashDataService._process_session
+    _ensure_numeric = staticmethod(to_number)
+    _get_merchant_type = DoorDashDataService._get_merchant_type
+
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self.data_file = self.db_file
+        self._local = threading.local()
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # Writes
+
+    def _insert_session(self, conn: sqlite3.Connection, session: Dict[str, Any], keep_id: bool = False):
+        """Insert one session; it gets a new id unless ``keep_id`` and it has a valid one"""
+        extra = {k: v for k, v in session.items() if k not in SESSION_FIELDS and k not in ("id", "deliveries")}
+        session_id = session.get("id")
+        cur = conn.execute(
+            "INSERT INTO sessions (id, date, start_time, end_time, active_time_minutes, dash_time_minutes,"
+            " deliveries_count, earnings, challenge_bonus, has_deliveries, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session_id if keep_id and is_session_id(session_id) else None,
+                session.get("date"),
+                session.get("start_time"),
+                session.get("end_time"),
+                self._optional_number(session, "active_time_minutes"),
+                self._optional_number(session, "dash_time_minutes"),
+                self._optional_number(session, "deliveries_count"),
+                self._optional_number(session, "earnings"),
+                self._optional_number(session, "challenge_bonus"),
+                1 if "deliveries" in session else 0,
+                json.dumps(extra) if extra else None,
+            ),
+        )
+        rows = []
+        for position, delivery in enumerate(session.get("deliveries") or []):
+            if not isinstance(delivery, RECORD_TYPES):
+                continue
+            extra = {k: v for k, v in delivery.items() if k not in DELIVERY_FIELDS}
+            rows.append((
+                cur.lastrowid,
+                position,
+                delivery.get("restaurant"),
+                delivery.get("merchant_type"),
+                self._optional_number(delivery, "doordash_pay"),
+                self._optional_number(delivery, "tip"),
+                self._optional_number(delivery, "total"),
+                json.dumps(extra) if extra else None,
+            ))
+        conn.executemany(
+            "INSERT INTO deliveries (session_id, position, restaurant, merchant_type, doordash_pay, tip, total, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _bump_version(self, conn: sqlite3.Connection):
+        """Record a mutation; called inside the writing transaction"""
+        conn.execute("UPDATE meta SET version = version + 1, modified = ? WHERE id = 1", (time.time(),))
+
+    def _optional_number(self, row: Dict[str, Any], key: str) -> Optional[float]:
+        return self._ensure_numeric(row[key]) if key in row else None
+
+    def import_sessions(self, sessions: Iterable[Dict[str, Any]], replace: bool = False) -> int:
+        """Bulk insert sessions in a single transaction, keeping their ids; returns the count"""
+        conn = self._connect()
+        count = 0
+        with conn:
+            if replace:
+                conn.execute("DELETE FROM deliveries")
+                conn.execute("DELETE FROM sessions")
+            for session in sessions:
+                if not isinstance(session, RECORD_TYPES):
+                    continue
+                self._process_session(session)
+                self._insert_session(conn, session, keep_id=True)
+                count += 1
+            self._bump_version(conn)
+        return count
+
+    def add_session(self, session_data: Dict[str, Any]) -> bool:
+        """Add a new session to the data"""
+        try:
+            self._process_session(session_data)
+            conn = self._connect()
+            with conn:
+                self._insert_session(conn, session_data)
+                self._bump_version(conn)
+            return True
+        except Exception as e:
+            print(f"Error adding session: {e}")
+            return False
+
+    def add_sessions(self, sessions: List[Dict[str, Any]]) -> bool:
+        """Add many sessions in one transaction"""
+        try:
+            for session in sessions:
+                self._process_session(session)
+            conn = self._connect()
+            with conn:
+                for session in sessions:
+                    self._insert_session(conn, session)
+                self._bump_version(conn)
+            return True
+        except Exception as e:
+            print(f"Error adding sessions: {e}")
+            return False
+
+    def delete_session(self, session_id: int) -> bool:
+        """Delete the session with ``session_id``; False if there is none"""
+        try:
+            conn = self._connect()
+            with conn:
+                if conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount == 0:
+                    return False
+                self._bump_version(conn)
+            return True
+        except Exception as e:
+            print(f"Error deleting session: {e}")
+            return False
+
+    def refresh_cache(self):
+        """Nothing is cached in-process; kept for interface compatibility"""
+        return self.load_data()
+
+    @property
+    def version(self) -> int:
+        """Write counter shared by every connection to the database"""
+        return self._connect().execute("SELECT version FROM meta WHERE id = 1").fetchone()[0]
+
+    def validators(self) -> Tuple[str, float]:
+        """``(etag, last_modified)`` from the version row bumped by every write"""
+        version, modified = self._connect().execute("SELECT version, modified FROM meta WHERE id = 1").fetchone()
+        return f"{version}-{int(modified * 1000)}", modified
+
+    def aggregates_age(self) -> float:
+        """Aggregates are computed per query, so they are never stale"""
+        return 0.0
+
+    def save_aggregate_cache(self) -> bool:
+        """Nothing to materialize; SQLite answers aggregates directly"""
+        return False
+
+    # Reads
+
+    def _sessions_from_rows(self, conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Rebuild session dicts (with nested deliveries) from session rows"""
+        sessions = {}
+        for row in rows:
+            session = {"id": row["id"]}
+            session.update((k, row[k]) for k in SESSION_FIELDS if row[k] is not None)
+            if row["extra"]:
+                session.update(json.loads(row["extra"]))
+            if row["has_deliveries"]:
+                session["deliveries"] = []
+            sessions[row["id"]] = session
+
+        ids = list(sessions)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for d in conn.execute(
+                f"SELECT * FROM deliveries WHERE session_id IN ({placeholders}) ORDER BY session_id, position",
+                chunk,
+            ):
+                delivery = {k: d[k] for k in DELIVERY_FIELDS if d[k] is not None}
+                if d["extra"]:
+                    delivery.update(json.loads(d["extra"]))
+                sessions[d["session_id"]].setdefault("deliveries", []).append(delivery)
+        return list(sessions.values())
+
+    def load_data(self) -> Dict[str, Any]:
+        """Full dataset in the JSON file layout (debug/export use only)"""
+        try:
+            conn = self._connect()
+            rows = conn.execute("SELECT * FROM sessions ORDER BY id").fetchall()
+            return {"sessions": self._sessions_from_rows(conn, rows)}
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return {"sessions": [], "currency": "USD"}
+
+    def _session_filters(self, start_date: Optional[str], end_date: Optional[str],
+                         merchant: Optional[str], merchant_type: Optional[str]) -> Tuple[List[str], List[Any]]:
+        where, params = [], []
+        if start_date:
+            where.append("s.date >= ?")
+            params.append(start_date)
+        if end_date:
+            where.append("s.date <= ?")
+            params.append(end_date)
+        if merchant:
+            where.append("EXISTS (SELECT 1 FROM deliveries d WHERE d.session_id = s.id AND d.restaurant = ?)")
+            params.append(merchant)
+        if merchant_type:
+            where.append("EXISTS (SELECT 1 FROM deliveries d WHERE d.session_id = s.id AND d.merchant_type = ?)")
+            params.append(merchant_type)
+        return where, params
+
+    def query_sessions(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       merchant: Optional[str] = None, merchant_type: Optional[str] = None,
+                       limit: int = 1000, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Filtered page of sessions plus the total number of matches"""
+        where, params = self._session_filters(start_date, end_date, merchant, merchant_type)
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM sessions s{clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT s.* FROM sessions s{clause} ORDER BY s.id LIMIT ? OFFSET ?",
+            params + [max(0, limit), max(0, offset)],
+        ).fetchall()
+        return self._sessions_from_rows(conn, rows), total
+
+    def query_sessions_after(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                             merchant: Optional[str] = None, merchant_type: Optional[str] = None,
+                             after: Optional[Tuple[str, int]] = None,
+                             limit: int = 1000) -> Tuple[List[Dict[str, Any]], int, Optional[Tuple[str, int]]]:
+        """Keyset page in (date, id) order; returns the page, total and next key"""
+        where, params = self._session_filters(start_date, end_date, merchant, merchant_type)
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM sessions s{clause}", params).fetchone()[0]
+        if after:
+            where = where + ["(IFNULL(s.date, ''), s.id) > (?, ?)"]
+            params = params + list(after)
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        # One extra row tells whether another page follows
+        rows = conn.execute(
+            f"SELECT s.* FROM sessions s{clause} ORDER BY IFNULL(s.date, ''), s.id LIMIT ?",
+            params + [max(0, limit) + 1],
+        ).fetchall()
+        more = len(rows) > max(0, limit)
+        rows = rows[:max(0, limit)]
+        next_key = (rows[-1]["date"] or "", rows[-1]["id"]) if more and rows else None
+        return self._sessions_from_rows(conn, rows), total, next_key
+
+    def summary(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        if start_date is not None or end_date is not None:
+            return summary_response(self.range_totals(start_date, end_date))
+        conn = self._connect()
+        deliveries, earnings = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM deliveries"
+        ).fetchone()
+        sessions, dash, active, bonus, bonus_count = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(dash_time_minutes), 0), COALESCE(SUM(active_time_minutes), 0),"
+            " COALESCE(SUM(challenge_bonus), 0), COUNT(challenge_bonus) FROM sessions"
+        ).fetchone()
+        return summary_response({
+            "sessions": sessions,
+            "earnings": float(earnings),
+            "deliveries": deliveries,
+            "dash_minutes": float(dash),
+            "active_minutes": float(active),
+            "challenge_bonus": float(bonus),
+            "challenge_count": bonus_count,
+        })
+
+    def range_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+        """Totals for sessions dated within the inclusive range (uses the date index)"""
+        day_range(start_date, end_date)  # validates both bounds
+        where, params = self._session_filters(start_date, end_date, None, None)
+        clause = " WHERE s.date IS NOT NULL" + "".join(" AND " + w for w in where)
+        conn = self._connect()
+        deliveries, earnings = conn.execute(
+            f"SELECT COUNT(d.id), COALESCE(SUM(d.total), 0) FROM sessions s JOIN deliveries d ON d.session_id = s.id{clause}",
+            params,
+        ).fetchone()
+        days, sessions, dash, active, bonus = conn.execute(
+            "SELECT COUNT(DISTINCT s.date), COUNT(*), COALESCE(SUM(s.dash_time_minutes), 0),"
+            " COALESCE(SUM(s.active_time_minutes), 0), COALESCE(SUM(s.challenge_bonus), 0)"
+            f" FROM sessions s{clause}",
+            params,
+        ).fetchone()
+        return {
+            "days": days,
+            "sessions": sessions,
+            "earnings": float(earnings),
+            "deliveries": deliveries,
+            "dash_minutes": float(dash),
+            "active_minutes": float(active),
+            "challenge_bonus": float(bonus),
+        }
+
+    def _restaurant_sums(self, conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+        restaurants = {}
+        for name, count, earnings, base_pay, tips in conn.execute(
+            "SELECT COALESCE(restaurant, 'Unknown'), COUNT(*), COALESCE(SUM(total), 0),"
+            " COALESCE(SUM(doordash_pay), 0), COALESCE(SUM(tip), 0)"
+            " FROM deliveries GROUP BY 1 ORDER BY MIN(id)"
+        ):
+            restaurants[name] = {
+                "deliveries_count": count,
+                "total_earnings": float(earnings),
+                "base_pay_total": float(base_pay),
+                "tips_total": float(tips),
+                "dates": {},
+            }
+        return restaurants
+
+    def restaurants_summary(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        restaurants = self._restaurant_sums(conn)
+        if limit is not None:
+            # Only the top restaurants need their visit dates
+            restaurants = dict(heapq.nlargest(max(0, limit), restaurants.items(),
+                                              key=lambda item: item[1]["total_earnings"]))
+        for name, session_date, count in conn.execute(
+            "SELECT COALESCE(d.restaurant, 'Unknown'), COALESCE(s.date, ''), COUNT(*)"
+            " FROM deliveries d JOIN sessions s ON s.id = d.session_id"
+            " GROUP BY 1, 2 ORDER BY MIN(d.id)"
+        ):
+            if name in restaurants:
+                restaurants[name]["dates"][session_date] = count
+        return restaurants_response(restaurants, limit)
+
+    def locations(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return locations_response(self._restaurant_sums(self._connect()), limit)
+
+    def _daily_totals(self, conn: sqlite3.Connection) -> Dict[int, Dict[str, Any]]:
+        """Totals per day number, counting every delivery and bonus like the JSON backend"""
+        dates = {}
+        for session_date, sessions, earnings, deliveries, dash, active, bonus in conn.execute(
+            """
+            SELECT s.date, COUNT(*),
+                   COALESCE(SUM(t.total), 0) + COALESCE(SUM(s.challenge_bonus), 0),
+                   COALESCE(SUM(t.count), 0),
+                   COALESCE(SUM(s.dash_time_minutes), 0),
+                   COALESCE(SUM(s.active_time_minutes), 0),
+                   COALESCE(SUM(s.challenge_bonus), 0)
+            FROM sessions s
+            LEFT JOIN (SELECT session_id, SUM(total) AS total, COUNT(*) AS count FROM deliveries GROUP BY session_id) t
+                   ON t.session_id = s.id
+            WHERE s.date IS NOT NULL
+            GROUP BY s.date
+            """
+        ):
+            day = _day_number(session_date)
+            if day == NO_DAY:
+                continue
+            # Differently written dates can name the same day
+            row = dates.setdefault(day, {"sessions": 0, "earnings": 0.0, "deliveries": 0.0,
+                                         "dash_minutes": 0.0, "active_minutes": 0.0, "challenge_bonus": 0.0})
+            row["sessions"] += sessions
+            row["earnings"] += float(earnings)
+            row["deliveries"] += float(deliveries)
+            row["dash_minutes"] += float(dash)
+            row["active_minutes"] += float(active)
+            row["challenge_bonus"] += float(bonus)
+        return dates
+
+    def weekly(self) -> List[Dict[str, Any]]:
+        return weekly_response(period_totals(self._daily_totals(self._connect()), "week"))
+
+    def rollup(self, granularity: str) -> List[Dict[str, Any]]:
+        return rollup_response(granularity, period_totals(self._daily_totals(self._connect()), granularity))
+
+    def heatmap(self) -> Dict[str, Any]:
+        columns = {name: [] for name in ("day", "start", "end") + HourlyHeatmap.FIELDS}
+        for session_date, start_time, end_time, earnings, deliveries, dash, active in self._connect().execute(
+            """
+            SELECT s.date, s.start_time, s.end_time,
+                   COALESCE(t.total, 0) + COALESCE(s.challenge_bonus, 0),
+                   COALESCE(t.count, 0),
+                   COALESCE(s.dash_time_minutes, 0),
+                   COALESCE(s.active_time_minutes, 0)
+            FROM sessions s
+            LEFT JOIN (SELECT session_id, SUM(total) AS total, COUNT(*) AS count FROM deliveries GROUP BY session_id) t
+                   ON t.session_id = s.id
+            """
+        ):
+            columns["day"].append(_day_number(session_date))
+            columns["start"].append(_minute_of_day(start_time))
+            columns["end"].append(_minute_of_day(end_time))
+            columns["earnings"].append(float(earnings))
+            columns["deliveries"].append(float(deliveries))
+            columns["dash_minutes"].append(float(dash))
+            columns["active_minutes"].append(float(active))
+        arrays = {name: np.asarray(values) for name, values in columns.items()}
+        return HourlyHeatmap.build(arrays.pop("day"), arrays.pop("start"), arrays.pop("end"), arrays).response()
+
+    def timeseries(self) -> Dict[str, List]:
+        timeseries = {"labels": [], "earnings": [], "deliveries": [], "dash_time": [], "active_time": []}
+        for row in self._connect().execute(
+            "SELECT date, COALESCE(earnings, 0), COALESCE(deliveries_count, 0),"
+            " COALESCE(dash_time_minutes, 0), COALESCE(active_time_minutes, 0)"
+            " FROM sessions WHERE date IS NOT NULL ORDER BY date, id"
+        ):
+            timeseries["labels"].append(row[0])
+            timeseries["earnings"].append(round(float(row[1]), 2))
+            timeseries["deliveries"].append(int(row[2]))
+            timeseries["dash_time"].append(float(row[3]))
+            timeseries["active_time"].append(float(row[4]))
+        return timeseries
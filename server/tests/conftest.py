@@ -0,0 +1,70 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Import the server modules the same way app.py does
+SERVER_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(SERVER_DIR))
+
+from core.data_service import DoorDashDataService
+
+# Far past anything a test writes, so compaction only runs when a test calls it
+NO_COMPACTION = 10 ** 6
+
+
+def make_session(date, restaurant="Chipotle", total=12.5, **fields):
+    """A session with one delivery; totals are exact in binary so sums compare exactly"""
+    return {
+        "date": date,
+        "start_time": "18:00",
+        "end_time": "19:30",
+        "active_time_minutes": 60.0,
+        "dash_time_minutes": 90.0,
+        "deliveries_count": 1.0,
+        "deliveries": [{"restaurant": restaurant, "doordash_pay": total - 4.0, "tip": 4.0, "total": total}],
+        **fields,
+    }
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "doordash_sessions.json"
+    sessions = [
+        make_session("2024-01-02", "Chipotle", 12.5),
+        make_session("2024-01-01", "Walgreens", 8.25),
+        make_session("2024-01-03", "Just Salad", 15.75),
+        make_session("2024-01-02", "Chipotle", 9.5),
+    ]
+    path.write_text(json.dumps({"sessions": sessions, "currency": "USD"}))
+    return path
+
+
+@pytest.fixture(params=[True, False], ids=["binary-snapshot", "json-only"])
+def binary_snapshot(request):
+    return request.param
+
+
+@pytest.fixture
+def open_service(data_file, binary_snapshot):
+    """Open a service over ``data_file``, like a worker process starting up"""
+    def open_service(**kwargs):
+        kwargs.setdefault("journal_max_records", NO_COMPACTION)
+        kwargs.setdefault("binary_snapshot", binary_snapshot)
+        return DoorDashDataService(data_file, **kwargs)
+    return open_service
+
+
+def session_ids(service):
+    return [session["id"] for session in service.load_data()["sessions"]]
+
+
+def served_state(service):
+    """Everything the dashboard reads, for comparing two services"""
+    return {
+        "sessions": service.load_data()["sessions"],
+        "summary": service.summary(),
+        "restaurants": service.restaurants_summary(),
+        "page": service.query_sessions(merchant="Chipotle", limit=2, offset=1)[0][:],
+    }
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+
+from conftest import SERVER_DIR, make_session, served_state, session_ids
+
+# Adds sessions from a separate process, compacting every few writes like a
+# busy worker would
+WRITER = """
+import sys
+from pathlib import Path
+from core.data_service import DoorDashDataService
+
+path, tag, count, binary_snapshot = Path(sys.argv[1]), sys.argv[2], int(sys.argv[3]), sys.argv[4] == "1"
+service = DoorDashDataService(path, journal_max_records=5, binary_snapshot=binary_snapshot)
+for i in range(count):
+    session = {"date": "2024-02-01", "note": f"{tag}-{i}",
+               "deliveries": [{"restaurant": "Chipotle", "total": 10.0}]}
+    if not service.add_session(session):
+        sys.exit(f"write {i} failed")
+"""
+
+
+def start_writer(data_file, tag, count, binary_snapshot):
+    env = {**os.environ, "PYTHONPATH": str(SERVER_DIR)}
+    return subprocess.Popen(
+        [sys.executable, "-c", WRITER, str(data_file), tag, str(count), "1" if binary_snapshot else "0"],
+        cwd=SERVER_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+
+
+def remove_derived_files(data_file):
+    """Drop everything but the sessions file and journal, forcing a parse from scratch"""
+    for path in (data_file.with_suffix(".snapshot"), data_file.with_suffix(".generation"),
+                 data_file.parent / "cache.json"):
+        if path.exists():
+            path.unlink()
+
+
+def test_replay_matches_fresh_load(open_service, data_file, binary_snapshot):
+    service = open_service()
+    assert service.add_session(make_session("2024-01-05", "Walgreens", 7.5))
+    assert service.delete_session(2)
+    assert service.add_sessions([make_session("2023-12-31"), make_session("2024-01-04", "Just Salad", 3.25)])
+    assert service.delete_session(5)
+    assert session_ids(service) == [1, 3, 4, 6, 7]
+    expected = served_state(service)
+
+    # A new worker replays the journal over the untouched sessions file
+    assert served_state(open_service()) == expected
+
+    # Folded into the sessions file and parsed again from scratch
+    service.compact()
+    assert data_file.with_name(data_file.stem + ".journal.jsonl").stat().st_size == 0
+    remove_derived_files(data_file)
+    assert served_state(open_service(binary_snapshot=False)) == expected
+    assert served_state(open_service()) == expected
+
+
+def test_replay_stops_at_torn_record(open_service, data_file):
+    service = open_service()
+    assert service.add_session(make_session("2024-01-05"))
+    expected = served_state(service)
+
+    # A crash mid-append leaves half a record at the end of the journal
+    with open(service.journal.path, "ab") as f:
+        f.write(b'{"seq": 2, "op": "add", "session": {"date": "2024-0')
+    replayed = open_service()
+    assert served_state(replayed) == expected
+
+    # The next append starts on a fresh line instead of extending the torn one
+    assert replayed.add_session(make_session("2024-01-06"))
+    assert session_ids(open_service()) == session_ids(replayed) == [1, 2, 3, 4, 5, 6]
+
+
+def test_compaction_keeps_writes_from_other_processes(open_service, data_file, binary_snapshot):
+    service = open_service()
+    writers = [start_writer(data_file, tag, 20, binary_snapshot) for tag in "abc"]
+    # Compact here too while the other processes append and compact
+    while any(writer.poll() is None for writer in writers):
+        service.compact()
+    for writer in writers:
+        assert writer.returncode == 0, writer.stderr.read().decode()
+
+    expected_notes = sorted(f"{tag}-{i}" for tag in "abc" for i in range(20))
+    for reader in (service, open_service()):
+        sessions = reader.load_data()["sessions"]
+        assert len(sessions) == 4 + 60
+        assert sorted(s["note"] for s in sessions if "note" in s) == expected_notes
+        assert reader.summary()["total_deliveries"] == 64
+
+
+def test_ids_stay_unique_across_processes(open_service, data_file, binary_snapshot):
+    worker = open_service()
+    writers = [start_writer(data_file, tag, 20, binary_snapshot) for tag in "ab"]
+    for i in range(10):
+        assert worker.add_session(make_session("2024-03-01", note=f"worker-{i}"))
+    for writer in writers:
+        assert writer.wait() == 0, writer.stderr.read().decode()
+
+    ids = session_ids(worker)
+    assert len(ids) == 4 + 50
+    assert len(set(ids)) == len(ids)
+    # Every worker, and a cold start, agrees on which session has which id
+    numbered = [(s.get("note"), s["id"]) for s in worker.load_data()["sessions"]]
+    service = open_service()
+    service.compact()
+    remove_derived_files(data_file)
+    for other in (open_service(), open_service(binary_snapshot=False)):
+        assert [(s.get("note"), s["id"]) for s in other.load_data()["sessions"]] == numbered
+
+    # A delete by id removes that session in every worker
+    target = dict(numbered)["a-7"]
+    assert worker.delete_session(target)
+    assert target not in session_ids(service)
+    assert not service.delete_session(target)
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from conftest import make_session, session_ids
+
+
+class HeldWriter:
+    """Holds the writer thread inside its first commit so later writes queue up.
+
+    Everything submitted while it's held is committed as the next batch.
+    """
+
+    def __init__(self, service, monkeypatch):
+        self.service = service
+        self.batches = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.results = {}
+        self._threads = []
+        commit = service._commit
+
+        def held_commit(batch):
+            self.entered.set()
+            self.release.wait()
+            self.batches.append(len(batch))
+            commit(batch)
+
+        monkeypatch.setattr(service, "_commit", held_commit)
+        # The first write only occupies the writer
+        self._start("first", service.add_session, make_session("2024-01-09"))
+        assert self.entered.wait(5)
+
+    def _start(self, name, method, *args):
+        thread = threading.Thread(target=lambda: self.results.__setitem__(name, method(*args)))
+        thread.start()
+        self._threads.append(thread)
+
+    def submit(self, name, method, *args):
+        """Call ``method`` from a new thread and wait until its write is queued"""
+        queued = self.service._pending.qsize()
+        self._start(name, method, *args)
+        deadline = time.monotonic() + 5
+        while self.service._pending.qsize() == queued:
+            assert time.monotonic() < deadline, "write was never queued"
+            time.sleep(0.001)
+
+    def finish(self):
+        self.release.set()
+        for thread in self._threads:
+            thread.join(5)
+        return self.results
+
+
+@pytest.fixture
+def service(open_service):
+    return open_service()
+
+
+def test_queued_writes_commit_as_one_batch(service, monkeypatch):
+    appends = []
+    append_many = service.journal.append_many
+
+    def counted_append(records):
+        appends.append(len(records))
+        return append_many(records)
+
+    monkeypatch.setattr(service.journal, "append_many", counted_append)
+
+    writer = HeldWriter(service, monkeypatch)
+    for i in range(5):
+        writer.submit(f"add-{i}", service.add_session, make_session("2024-02-01", note=str(i)))
+    writer.submit("bulk", service.add_sessions, [make_session("2024-02-02"), make_session("2024-02-03")])
+    results = writer.finish()
+
+    assert all(results.values()) and len(results) == 7
+    assert writer.batches == [1, 6]
+    # One fsynced journal write per batch
+    assert appends == [1, 7]
+    assert len(session_ids(service)) == 4 + 8
+
+
+def test_ops_in_a_batch_apply_in_queue_order(service, monkeypatch):
+    writer = HeldWriter(service, monkeypatch)
+    writer.submit("delete", service.delete_session, 2)
+    writer.submit("add-a", service.add_session, make_session("2024-02-01", note="a"))
+    writer.submit("delete-again", service.delete_session, 2)
+    writer.submit("delete-unknown", service.delete_session, 99)
+    writer.submit("add-b", service.add_session, make_session("2024-02-01", note="b"))
+    results = writer.finish()
+
+    assert results == {"first": True, "delete": True, "add-a": True, "delete-again": False,
+                       "delete-unknown": False, "add-b": True}
+    # Ids follow queue order, and the failed deletes didn't touch anything
+    sessions = service.load_data()["sessions"]
+    assert [s["id"] for s in sessions] == [1, 3, 4, 5, 6, 7]
+    assert [s.get("note") for s in sessions[-2:]] == ["a", "b"]
+
+
+def test_failed_journal_write_fails_every_future_in_the_batch(service, monkeypatch):
+    def fail(records):
+        raise OSError("disk full")
+
+    writer = HeldWriter(service, monkeypatch)
+    writer.submit("add", service.add_session, make_session("2024-02-01"))
+    writer.submit("delete", service.delete_session, 1)
+    monkeypatch.setattr(service.journal, "append_many", fail)
+    results = writer.finish()
+
+    assert results == {"first": False, "add": False, "delete": False}
+    assert session_ids(service) == [1, 2, 3, 4]
+
+    # The writer thread survives the error and commits the next write
+    monkeypatch.undo()
+    assert service.add_session(make_session("2024-02-02"))
+    assert session_ids(service) == [1, 2, 3, 4, 5]
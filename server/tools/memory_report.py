@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+DoorDashboard Memory Report
+---------------------------
+Measure how much memory the loaded sessions take as plain dicts versus the
+slotted Session/Delivery records the data service keeps
+"""
+import sys
+import gc
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Adjust import path to include parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import DATA_FILE
+from core import codec
+from core.data_service import DoorDashDataService
+from core.models import to_session
+
+def _measure(build):
+    """Bytes still allocated by the object ``build()`` returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def memory_report(data_file=DATA_FILE):
+    """Print bytes per session and per delivery for both representations"""
+    try:
+        raw = Path(data_file).read_bytes()
+        # Normalization only needs the service's pure helpers, not a loaded file
+        normalize = object.__new__(DoorDashDataService)._process_session
+
+        def as_dicts():
+            sessions = codec.loads(raw).get("sessions", [])
+            for session in sessions:
+                normalize(session)
+            return sessions
+
+        def as_records():
+            sessions = [to_session(s) for s in codec.loads(raw).get("sessions", [])]
+            for session in sessions:
+                normalize(session)
+            return sessions
+
+        dicts, dict_bytes = _measure(as_dicts)
+        n_sessions = len(dicts)
+        n_deliveries = sum(len(s.get("deliveries") or []) for s in dicts)
+        del dicts
+        records, record_bytes = _measure(as_records)
+        del records
+
+        print(f"{n_sessions} sessions, {n_deliveries} deliveries in {data_file}")
+        for label, size in (("dicts", dict_bytes), ("records", record_bytes)):
+            per_delivery = size / n_deliveries if n_deliveries else 0
+            print(f"  {label:8} {size / 1e6:8.1f} MB  {per_delivery:6.0f} bytes/delivery")
+        if dict_bytes:
+            print(f"  saved    {100 * (1 - record_bytes / dict_bytes):.0f}%")
+        return True
+    except Exception as e:
+        print(f"❌ Error measuring memory: {str(e)}")
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description='DoorDashboard session memory report')
+
+    parser.add_argument('--file', help='Data file to measure (default from settings)')
+
+    args = parser.parse_args()
+
+    success = memory_report(args.file or DATA_FILE)
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+DoorDashboard SQLite Migration
+------------------------------
+Import the JSON sessions file (plus any pending journal records) into the
+SQLite storage backend
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Adjust import path to include parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from config.settings import DATA_FILE, SQLITE_FILE
+from core.data_service import DoorDashDataService
+from core.sqlite_service import SQLiteDataService
+
+def migrate(data_file=DATA_FILE, db_file=SQLITE_FILE, replace=False):
+    """Copy every session from the JSON store into the SQLite database"""
+    try:
+        if not Path(data_file).exists():
+            print(f"❌ Data file not found: {data_file}")
+            return False
+
+        # Load through the JSON backend so the journal is replayed and rows are normalized
+        print(f"Loading sessions from {data_file}")
+        sessions = DoorDashDataService(Path(data_file)).load_data().get("sessions", [])
+
+        store = SQLiteDataService(Path(db_file))
+        if not replace:
+            _, existing = store.query_sessions(limit=0)
+            if existing:
+                print(f"❌ {db_file} already holds {existing} sessions (use --replace to overwrite)")
+                return False
+
+        count = store.import_sessions(sessions, replace=replace)
+        print(f"✅ Migrated {count} sessions to {db_file}")
+        print("Set STORAGE_BACKEND=sqlite to serve from the database")
+        return True
+    except Exception as e:
+        print(f"❌ Error migrating data: {str(e)}")
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description='DoorDashboard JSON to SQLite migration')
+
+    parser.add_argument('--file', help='JSON data file to import (default from settings)')
+    parser.add_argument('--db', help='SQLite database to create (default from settings)')
+    parser.add_argument('--replace', action='store_true', help='Replace existing rows in the database')
+
+    args = parser.parse_args()
+
+    success = migrate(args.file or DATA_FILE, args.db or SQLITE_FILE, args.replace)
+
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,6 @@ DoorDashboard Data Repair Tool
 Fix common issues in data files
 """
 import sys
-import json
 import argparse
 from pathlib import Path
 
@@ -13,22 +12,9 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from config.settings import DATA_FILE
-
-def ensure_numeric(value):
-    """Convert various data types to a numeric (float) value"""
-    if isinstance(value, (int, float)):
-        return float(value)
-    elif isinstance(value, str):
-        # Remove any currency symbols or commas
-        clean_value = value.replace('$', '').replace(',', '').strip()
-        try:
-            return float(clean_value)
-        except ValueError:
-            print(f"Warning: Could not convert '{value}' to a number, using 0")
-            return 0.0
-    else:
-        # For None or other types
-        return 0.0
+from core import codec
+from core.codec import to_number as ensure_numeric
+from core.merchant_types import classify_merchant
 
 def repair_data(data_file=DATA_FILE, backup=True):
     """Repair common issues in data file"""
@@ -41,8 +27,7 @@ def repair_data(data_file=DATA_FILE, backup=True):
                 dst.write(src.read())
         
         # Load data
-        with open(data_file, 'r') as f:
-            data = json.load(f)
+        data = codec.load_file(data_file)
         
         # Check if sessions key exists
         if "sessions" not in data:
@@ -101,22 +86,14 @@ def repair_data(data_file=DATA_FILE, backup=True):
                     
                     # Add merchant type if missing
                     if "merchant_type" not in delivery and "restaurant" in delivery:
-                        merchant_name = delivery["restaurant"].lower()
-                        if any(s in merchant_name for s in ["cvs", "walgreens", "walmart", "target", "dollar general", "7-eleven"]):
-                            delivery["merchant_type"] = "Shopping"
-                        elif any(s in merchant_name for s in ["kroger", "publix", "safeway", "albertsons", "aldi", "whole foods"]):
-                            delivery["merchant_type"] = "Grocery"
-                        elif any(s in merchant_name for s in ["mcdonald", "burger king", "wendy", "taco bell", "kfc", "chipotle"]):
-                            delivery["merchant_type"] = "Fast Food"
-                        else:
-                            delivery["merchant_type"] = "Restaurant"
+                        delivery["merchant_type"] = classify_merchant(delivery["restaurant"])
                 
                 # Update deliveries_count if needed
                 session["deliveries_count"] = len(session["deliveries"])
         
         # Save fixed data
-        with open(data_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(data_file, 'wb') as f:
+            f.write(codec.dumps(data, indent=True))
         
         print(f"✅ Repair complete. Fixed {fixed_items} items.")
         return True
@@ -0,0 +1,86 @@
+import gzip
+import zlib
+from typing import Iterable, Iterator, List
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# Server preference order; brotli is only offered when the module is installed
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def encoded_etags(etag: str) -> List[str]:
+    """Every tag a client may hold for ``etag``, one per content coding"""
+    return [etag] + [f"{etag}-{encoding}" for encoding in ENCODINGS]
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        # brotli quality runs 0-11; map the 1-9 gzip level onto it
+        return brotli.compress(body, quality=min(11, level + 2))
+    return gzip.compress(body, compresslevel=level)
+
+
+def _compress_stream(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    """Compress a streamed body, flushing after each chunk so bytes go out as produced"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=min(11, level + 2))
+        for chunk in chunks:
+            data = compressor.process(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def init_compression(app, prefix: str = "/api/"):
+    """Compress responses under ``prefix`` for clients that accept gzip or brotli.
+
+    Buffered bodies smaller than ``COMPRESS_MIN_SIZE`` bytes go out as is;
+    streamed bodies are always compressed since their size isn't known up
+    front.
+    """
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    level = app.config.get("COMPRESS_LEVEL", 6)
+
+    @app.after_request
+    def compress_response(response):
+        if not request.path.startswith(prefix) or request.method == "HEAD":
+            return response
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        if response.direct_passthrough:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(ENCODINGS)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            response.set_data(_compress(body, encoding, level))
+
+        response.headers["Content-Encoding"] = encoding
+        # A strong ETag has to differ between codings of the same data
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
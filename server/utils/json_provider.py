@@ -0,0 +1,43 @@
+from flask.json.provider import DefaultJSONProvider
+
+from core import codec
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it's installed.
+
+    Keeps Flask's behaviour (sorted keys, pretty output in debug, the
+    ``default`` hook for dates/decimals) but serializes straight to bytes.
+    Session/Delivery records are serialized through their ``to_dict``.
+    Without orjson it behaves like the stock provider.
+    """
+
+    @staticmethod
+    def default(o):
+        if hasattr(o, "to_dict"):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
+    def _option(self, indent: bool = False) -> int:
+        option = codec.orjson.OPT_NON_STR_KEYS | codec.orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= codec.orjson.OPT_SORT_KEYS
+        if indent:
+            option |= codec.orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        if codec.orjson is None:
+            return super().dumps(obj, **kwargs)
+        return codec.orjson.dumps(obj, default=self.default, option=self._option(bool(kwargs.get("indent")))).decode()
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        if codec.orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = codec.orjson.dumps(obj, default=self.default, option=self._option(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
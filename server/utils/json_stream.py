@@ -0,0 +1,27 @@
+from typing import Any, Callable, Dict, Iterator
+
+# Serialized bytes to collect before handing a chunk to the server
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_object(payload: Dict[str, Any], stream_key: str,
+                     dumps: Callable[[Any], str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Serialize ``payload`` piece by piece.
+
+    ``payload[stream_key]`` is written one item at a time, so the full JSON
+    text never exists in memory and the first bytes leave before the last
+    item is encoded. The other fields are written first.
+    """
+    fields = {k: v for k, v in payload.items() if k != stream_key}
+    head = dumps(fields)[:-1]
+    parts = [head + ("," if fields else "") + dumps(stream_key) + ":["]
+    size = len(parts[0])
+    for i, item in enumerate(payload.get(stream_key) or []):
+        part = ("," if i else "") + dumps(item)
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(parts).encode("utf-8")
+            parts, size = [], 0
+    parts.append("]}")
+    yield "".join(parts).encode("utf-8")
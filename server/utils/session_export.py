@@ -0,0 +1,94 @@
+"""
+Streaming export of sessions as NDJSON or CSV.
+
+Sessions are fetched from the data service a keyset page at a time and
+written out as they arrive, so memory use doesn't grow with the export.
+Session-level CSV keeps deliveries as a JSON array cell (the format
+``POST /api/sessions/bulk`` reads back); delivery-level CSV has one row per
+delivery with its session's fields repeated, for spreadsheets.
+"""
+import csv
+import io
+from typing import Any, Dict, Iterator, List, Optional
+
+from core import codec
+from utils.json_stream import CHUNK_SIZE
+
+# Sessions fetched from the data service per page
+PAGE_SIZE = 1000
+
+SESSION_COLUMNS = ["date", "start_time", "end_time", "active_time_minutes", "dash_time_minutes",
+                   "deliveries_count", "earnings", "challenge_bonus"]
+DELIVERY_COLUMNS = ["restaurant", "merchant_type", "doordash_pay", "tip", "total"]
+
+
+def iter_sessions(service, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  merchant: Optional[str] = None, merchant_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Matching sessions in (date, id) order, one page in memory at a time"""
+    after = None
+    while True:
+        sessions, _, after = service.query_sessions_after(
+            start_date=start_date,
+            end_date=end_date,
+            merchant=merchant,
+            merchant_type=merchant_type,
+            after=after,
+            limit=PAGE_SIZE
+        )
+        yield from sessions
+        if after is None:
+            return
+
+
+def iter_ndjson(sessions: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """One JSON session per line"""
+    parts, size = [], 0
+    for session in sessions:
+        line = codec.dumps(session) + b"\n"
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def _iter_csv(header: List[str], rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, header, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _session_rows(sessions: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for session in sessions:
+        row = dict(session)
+        if "deliveries" in row:
+            row["deliveries"] = codec.dumps(row["deliveries"]).decode("utf-8")
+        yield row
+
+
+def _delivery_rows(sessions: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for number, session in enumerate(sessions, 1):
+        for delivery in session.get("deliveries") or []:
+            if isinstance(delivery, dict):
+                yield {**session, "session": number, **delivery}
+
+
+def iter_csv(sessions: Iterator[Dict[str, Any]], level: str = "session") -> Iterator[bytes]:
+    """CSV with one row per session, or per delivery when ``level`` is ``"delivery"``.
+
+    Delivery rows carry a ``session`` column numbering their session within
+    the export; sessions without deliveries have no rows at that level.
+    """
+    if level == "delivery":
+        return _iter_csv(["session"] + SESSION_COLUMNS + DELIVERY_COLUMNS, _delivery_rows(sessions))
+    return _iter_csv(SESSION_COLUMNS + ["deliveries"], _session_rows(sessions))
+
@@ -0,0 +1,92 @@
+"""
+Parsing of bulk session uploads.
+
+Bodies are read one line at a time from the request stream, as JSON Lines
+(one session object per line) or CSV (one session per row, with a header).
+Each row comes out as ``(row_number, session, error)`` with exactly one of
+``session`` / ``error`` set.
+"""
+import csv
+import io
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from core import codec
+from utils.validation import validate_session, validate_numeric_fields
+
+# Session fields that hold numbers (CSV cells arrive as strings)
+NUMERIC_FIELDS = ("active_time_minutes", "dash_time_minutes", "deliveries_count", "earnings", "challenge_bonus")
+
+Row = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def _checked(row: int, session: Any) -> Row:
+    """Validate a parsed row the same way POST /api/sessions does"""
+    if not isinstance(session, dict):
+        return row, None, "Expected a session object"
+    try:
+        valid = validate_session(session)
+    except (TypeError, AttributeError):
+        valid = False
+    if not valid:
+        return row, None, "Invalid session data"
+    if not validate_numeric_fields(session, NUMERIC_FIELDS):
+        return row, None, "Non-numeric session field"
+    return row, session, None
+
+
+def _buffered(stream):
+    """Buffer raw streams (like werkzeug's request stream), which are slow to read by line"""
+    return io.BufferedReader(stream) if isinstance(stream, io.RawIOBase) else stream
+
+
+def read_jsonl(stream) -> Iterator[Row]:
+    """Sessions from a JSON Lines byte stream; blank lines are skipped"""
+    for row, line in enumerate(_buffered(stream), 1):
+        if not line.strip():
+            continue
+        try:
+            session = codec.loads(line)
+        except Exception as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        yield _checked(row, session)
+
+
+def _csv_session(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Session dict for one CSV row; empty cells count as missing"""
+    session = {}
+    for key, value in record.items():
+        if key is None or value is None or value == "":
+            continue
+        key = key.strip()
+        if key == "deliveries":
+            # Deliveries are a JSON array in a single cell
+            value = codec.loads(value)
+        elif key in NUMERIC_FIELDS:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        session[key] = value
+    return session
+
+
+def read_csv(stream) -> Iterator[Row]:
+    """Sessions from a CSV byte stream with a header row.
+
+    Row numbers are line numbers in the upload, counting the header.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(_buffered(stream), encoding="utf-8", newline=""))
+    for record in reader:
+        try:
+            session = _csv_session(record)
+        except Exception as e:
+            yield reader.line_num, None, f"Invalid deliveries: {e}"
+            continue
+        yield _checked(reader.line_num, session)
+
+
+READERS = {
+    "jsonl": read_jsonl,
+    "csv": read_csv,
+}